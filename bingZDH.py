@@ -4,14 +4,55 @@ import logging
 import random
 import re
 import subprocess
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import requests
-from bs4 import BeautifulSoup
 import datetime
 import os
+import argparse
+import atexit
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import importlib
+import itertools
+import multiprocessing
+import signal
+import logging.handlers
+import queue
+import shutil
+import sys
+import threading
+
+# ========== 延迟导入 ==========
+class LazyImport:
+    """
+    首次访问属性或调用时才真正导入，
+    status/plan等不需要浏览器的命令因此无需加载selenium等依赖
+    """
+
+    def __init__(self, module_name, attr=None):
+        self._module_name = module_name
+        self._attr = attr
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            module = importlib.import_module(self._module_name)
+            self._target = getattr(module, self._attr) if self._attr else module
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+uc = LazyImport("undetected_chromedriver")
+By = LazyImport("selenium.webdriver.common.by", "By")
+WebDriverWait = LazyImport("selenium.webdriver.support.ui", "WebDriverWait")
+EC = LazyImport("selenium.webdriver.support.expected_conditions")
+requests = LazyImport("requests")
+BeautifulSoup = LazyImport("bs4", "BeautifulSoup")
+HEAVY_MODULES = ["undetected_chromedriver", "selenium.webdriver", "requests", "bs4"]
 
 # ========== CONFIG ==========
 WAIT_TIMEOUT = 15
@@ -23,6 +64,38 @@ HEADLESS = True  # True为无头模式
 SLEEP_BETWEEN_SEARCH = (10, 30)  # 搜索间隔秒数范围
 SLEEP_AFTER_4_SEARCH = 960  # 每4次搜索后暂停秒数
 MAX_SKIP = 8  # 跳过"创建通行密钥"页面最大尝试次数
+HEALTH_IDLE_PROBE_SECONDS = 60  # 会话空闲超过该秒数后才主动探测连接
+POPUP_WATCH_SECONDS = 3  # 读取弹窗监视结果的最长等待秒数
+POPUP_WATCH_HOSTS = ["login.live.com", "microsoftonline.com"]  # 匹配域名本身及其子域名
+POPUP_BUTTONS = {  # 各弹窗要点击的按钮文字，必须完全一致
+    "stay_signed_in": ["是", "Yes"],
+    "passkey": ["暂时跳过", "Skip for now"],
+}
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "debug_artifacts")  # 调试截图和页面源码目录
+ARTIFACT_MAX_BYTES = 50 * 1024 * 1024  # 调试文件总磁盘预算，超出时删除最旧文件
+RUN_HISTORY_KEEP = 30  # 运行历史中保留的最近运行次数
+AUTO_RUN_HOUR = 2  # 自动执行模式每天的执行时间（时）
+GROUP_ISOLATION = os.getenv("GROUP_ISOLATION", "").lower() == "process"  # 每个账号组在独立子进程中运行
+GROUP_TIMEOUT_SECONDS = 4 * 3600  # 隔离模式下单个账号组子进程的最长运行时间
+GROUP_MAX_MEMORY_MB = 4096  # 隔离模式下账号组子进程（含Chrome）内存上限，按进程树PSS之和计算
+SHUTDOWN_GRACE_SECONDS = 20  # 收到关闭信号后等待各账号组自行退出的最长秒数
+GROUP_START_DELAY = 15  # 相邻账号组的启动间隔秒数
+STATE_DIR = os.getenv("STATE_DIR", "state")  # 跨运行保留的状态文件目录
+BROWSER_BACKEND = os.getenv("BROWSER_BACKEND", "selenium")  # selenium(undetected_chromedriver)或cdp(直接DevTools协议)
+CHROME_BINARY = os.getenv("CHROME_BINARY")  # cdp后端使用的Chrome或chrome-headless-shell路径，默认在PATH中查找
+ASSET_CACHE = os.getenv("ASSET_CACHE") == "1"  # 启用跨运行共享的静态资源磁盘缓存
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", os.path.join(STATE_DIR, "asset_cache"))
+ASSET_CACHE_MAX_BYTES = 300 * 1024 * 1024  # 静态资源缓存总大小上限，超出时删除最旧文件
+ADAPTIVE_TIMEOUT_MIN = 2  # 自适应等待时间下限（秒）
+ADAPTIVE_TIMEOUT_MAX = 60  # 自适应等待时间上限（秒）
+ADAPTIVE_MIN_SAMPLES = 5  # 某个等待点至少有多少次成功记录才启用自适应
+ADAPTIVE_PERCENTILE = 0.95  # 按成功耗时的该分位数设置等待时间
+ADAPTIVE_MARGIN = (1.3, 1.0)  # 分位数乘以系数再加上秒数作为余量
+ADAPTIVE_HISTORY = 50  # 每个等待点保留的最近记录数
+CORPUS_DIR = os.getenv("CORPUS_DIR", "corpus")  # 页面快照库目录
+CORPUS_VERSION = 2  # 快照格式版本，格式变化时递增，回放只读取同版本快照
+RECORD_CORPUS = os.getenv("RECORD_CORPUS") == "1"  # 运行时录制页面快照
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # auto模式下在127.0.0.1提供/metrics的端口，0为不启用
 
 # 检查是否在GitHub Actions环境中
 if os.getenv('GITHUB_ACTIONS'):
@@ -35,16 +108,463 @@ if os.getenv('GITHUB_ACTIONS'):
     LOG_FILE = "/tmp/bing_automation.log"
 
 # ========== LOGGING ==========
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s: %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+LOG_DIR = os.getenv("LOG_DIR", "logs")  # 分组日志和单次运行日志目录
+LOG_ROTATE = os.getenv("LOG_ROTATE", "size")  # size按大小轮转，day按天轮转
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 按大小轮转时单个日志文件上限
+LOG_BACKUP_COUNT = 7  # 保留的压缩历史日志数量
+LOG_RUN_KEEP = 14  # 保留的单次运行日志数量
+LOG_FORMAT_JSON = os.getenv("LOG_FORMAT", "").lower() == "json"  # 结构化JSON日志
+LOG_TEXT_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+
+_log_context = threading.local()
+_log_listener = None
+_log_router = None
+_log_queue = None
+
+def set_log_group(group_name):
+    """标记当前线程的日志属于哪个账号组"""
+    _log_context.group = group_name
+
+def set_log_account(email):
+    """标记当前线程正在处理的账号，用于调试文件命名"""
+    _log_context.account = email
+
+class GroupContextFilter(logging.Filter):
+    """在调用线程上把账号组名写入日志记录，供后台写线程分流"""
+
+    def filter(self, record):
+        # 子进程转发来的记录已带有组名
+        if not hasattr(record, "group"):
+            record.group = getattr(_log_context, "group", None)
+        return True
+
+def is_data_record(record):
+    """过滤掉管道内部的控制记录"""
+    return not hasattr(record, "control")
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行JSON"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "group": getattr(record, "group", None),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source, dest):
+    """轮转时把旧日志压缩为.gz"""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def create_log_formatter():
+    return JsonFormatter() if LOG_FORMAT_JSON else logging.Formatter(LOG_TEXT_FORMAT)
+
+def create_rotating_handler(path):
+    """按LOG_ROTATE创建带压缩的轮转文件处理器"""
+    if LOG_ROTATE == "day":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when="midnight", backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(create_log_formatter())
+    return handler
+
+class LogRouter(logging.Handler):
+    """
+    运行在后台写线程中，把每条日志写入主日志、所属账号组日志和当前运行日志
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.main_handler = create_rotating_handler(LOG_FILE)
+        self.group_handlers = {}
+        self.run_handler = None
+        self.last_run_path = None
+        self.lock_handlers = threading.Lock()
+
+    def group_handler(self, group_name):
+        handler = self.group_handlers.get(group_name)
+        if handler is None:
+            safe_name = re.sub(r"[^\w.-]", "_", str(group_name))
+            handler = create_rotating_handler(os.path.join(LOG_DIR, f"group_{safe_name}.log"))
+            self.group_handlers[group_name] = handler
+        return handler
+
+    def emit(self, record):
+        control = getattr(record, "control", None)
+        if control == "stop_run":
+            # 队列中排在它之前的记录都已写入运行日志
+            self.stop_run()
+            record.done.set()
+            return
+        with self.lock_handlers:
+            self.main_handler.handle(record)
+            group_name = getattr(record, "group", None)
+            if group_name:
+                self.group_handler(group_name).handle(record)
+            if self.run_handler:
+                self.run_handler.handle(record)
+
+    def start_run(self, path):
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(create_log_formatter())
+        with self.lock_handlers:
+            self.run_handler = handler
+
+    def stop_run(self):
+        with self.lock_handlers:
+            handler, self.run_handler = self.run_handler, None
+        if handler:
+            handler.close()
+            self.last_run_path = handler.baseFilename
+        return self.last_run_path
+
+    def flush(self):
+        with self.lock_handlers:
+            for handler in [self.main_handler, self.run_handler, *self.group_handlers.values()]:
+                if handler:
+                    handler.flush()
+
+    def close(self):
+        with self.lock_handlers:
+            for handler in [self.main_handler, self.run_handler, *self.group_handlers.values()]:
+                if handler:
+                    handler.close()
+            self.group_handlers.clear()
+            self.run_handler = None
+        super().close()
+
+def setup_logging():
+    """
+    配置基于队列的日志管道：调用线程只把记录放入队列，
+    控制台输出和文件写入都由后台QueueListener线程完成
+    """
+    global _log_listener, _log_router, _log_queue
+    os.makedirs(LOG_DIR, exist_ok=True)
+    _log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(_log_queue)
+    queue_handler.addFilter(GroupContextFilter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_TEXT_FORMAT))
+    console_handler.addFilter(is_data_record)
+    _log_router = LogRouter()
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers = [queue_handler]
+
+    _log_listener = logging.handlers.QueueListener(_log_queue, console_handler, _log_router)
+    _log_listener.start()
+    atexit.register(shutdown_logging)
+
+def setup_console_logging():
+    """status/plan/bench/replay等命令只输出到控制台，不创建日志文件和后台线程"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_TEXT_FORMAT))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers = [handler]
+
+def shutdown_logging():
+    """处理完队列中剩余的日志并关闭所有文件"""
+    global _log_listener
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+        _log_router.close()
+
+def flush_logs():
+    if _log_router:
+        _log_router.flush()
+
+def start_run_log():
+    """为本次执行创建独立日志文件，返回文件路径"""
+    path = os.path.join(LOG_DIR, f"run_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    if _log_router:
+        _log_router.start_run(path)
+    return path
+
+def finish_run_log():
+    """关闭本次执行日志，压缩后只保留最近LOG_RUN_KEEP份"""
+    path = None
+    if _log_router and _log_listener:
+        done = threading.Event()
+        _log_queue.put(logging.makeLogRecord({"control": "stop_run", "done": done}))
+        done.wait(timeout=10)
+        path = _log_router.last_run_path
+    elif _log_router:
+        path = _log_router.stop_run()
+    if path and os.path.exists(path):
+        try:
+            _gzip_rotator(path, path + ".gz")
+        except OSError as e:
+            logger.warning(f"压缩运行日志失败: {e}")
+    runs = sorted(f for f in os.listdir(LOG_DIR) if f.startswith("run_") and f.endswith(".log.gz"))
+    for name in runs[:-LOG_RUN_KEEP]:
+        try:
+            os.remove(os.path.join(LOG_DIR, name))
+        except OSError:
+            pass
+
+# 日志管道由cli按命令启动：run/auto使用setup_logging，其他命令只输出到控制台
 logger = logging.getLogger(__name__)
 
+# ========== 关闭控制 ==========
+shutdown_event = threading.Event()
+_shutdown_signal = None
+_active_drivers = set()
+_active_drivers_lock = threading.Lock()
+
+class ShutdownRequested(BaseException):
+    """
+    收到关闭信号后由等待函数抛出。继承BaseException，
+    不会被业务代码中的except Exception吞掉，一路退回到账号组入口
+    """
+
+def request_shutdown(reason):
+    if not shutdown_event.is_set():
+        logger.warning(f"收到关闭请求（{reason}），正在停止所有账号组...")
+    shutdown_event.set()
+
+def check_shutdown():
+    if shutdown_event.is_set():
+        raise ShutdownRequested()
+
+def interruptible_sleep(seconds):
+    """代替time.sleep，收到关闭信号时立即抛出ShutdownRequested"""
+    if shutdown_event.wait(seconds):
+        raise ShutdownRequested()
+
+_interruptible_wait_class = None
+
+def wait_for(driver, timeout, site=None):
+    """
+    可被关闭信号打断的WebDriverWait。指定site时等待时间由timeout_manager
+    根据该等待点的历史耗时决定，timeout只作为数据不足时的默认值
+    """
+    global _interruptible_wait_class
+    if _interruptible_wait_class is None:
+        from selenium.common.exceptions import TimeoutException
+
+        class InterruptibleWait(WebDriverWait._load()):
+            site = None
+
+            def until(self, method, message=""):
+                start = time.monotonic()
+                end_time = start + self._timeout
+                while True:
+                    try:
+                        value = method(self._driver)
+                        if value:
+                            if self.site:
+                                timeout_manager.record_success(self.site, time.monotonic() - start)
+                            return value
+                    except self._ignored_exceptions:
+                        pass
+                    if time.monotonic() > end_time:
+                        if self.site:
+                            timeout_manager.record_miss(self.site)
+                        raise TimeoutException(message)
+                    interruptible_sleep(self._poll)
+
+        _interruptible_wait_class = InterruptibleWait
+    if site:
+        timeout = timeout_manager.timeout_for(site, timeout)
+    wait = _interruptible_wait_class(driver, timeout)
+    wait.site = site
+    return wait
+
+def register_driver(driver):
+    with _active_drivers_lock:
+        _active_drivers.add(driver)
+
+def quit_driver(driver):
+    """关闭driver并删除其临时用户数据目录，可被多个线程重复调用"""
+    if driver is None:
+        return
+    with _active_drivers_lock:
+        if driver not in _active_drivers:
+            return
+        _active_drivers.discard(driver)
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"关闭浏览器时出错: {e}")
+    profile_dir = getattr(driver, "_profile_dir", None)
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    cache_slot = getattr(driver, "_asset_cache_slot", None)
+    if cache_slot:
+        asset_cache.release(cache_slot)
+
+def quit_all_drivers():
+    with _active_drivers_lock:
+        drivers = list(_active_drivers)
+    for driver in drivers:
+        quit_driver(driver)
+    return len(drivers)
+
+def _handle_shutdown_signal(signum, frame):
+    # 信号处理函数中不写日志，避免与被打断的日志调用争用锁
+    global _shutdown_signal
+    if shutdown_event.is_set() and signum == signal.SIGINT:
+        # 第二次Ctrl-C时不再等待宽限期
+        raise KeyboardInterrupt
+    _shutdown_signal = signum
+    shutdown_event.set()
+
+def install_shutdown_handlers():
+    """在主线程注册SIGINT/SIGTERM处理"""
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, _handle_shutdown_signal)
+
+def shutdown_exit_code():
+    return 128 + _shutdown_signal if _shutdown_signal else 0
+
+def join_threads_with_grace(threads):
+    """
+    等待线程结束；收到关闭信号后最多再等SHUTDOWN_GRACE_SECONDS，
+    仍未退出的线程通过强制关闭其driver让阻塞中的WebDriver调用返回
+    """
+    while any(t.is_alive() for t in threads) and not shutdown_event.is_set():
+        for thread in threads:
+            thread.join(timeout=1)
+    if not shutdown_event.is_set():
+        return
+    logger.warning(f"收到关闭信号，等待各账号组在{SHUTDOWN_GRACE_SECONDS}秒内退出...")
+    deadline = time.monotonic() + SHUTDOWN_GRACE_SECONDS
+    for thread in threads:
+        thread.join(timeout=max(0, deadline - time.monotonic()))
+    alive = [t.name for t in threads if t.is_alive()]
+    if alive:
+        logger.warning(f"宽限期内未退出的线程: {alive}，强制关闭浏览器")
+    closed = quit_all_drivers()
+    if closed:
+        logger.info(f"已强制关闭 {closed} 个浏览器")
+    for thread in threads:
+        thread.join(timeout=5)
+
+# ========== 自适应超时 ==========
+class TimeoutManager:
+    """
+    记录每个命名等待点成功所需的时间并持久化，之后按成功耗时的高分位数加余量
+    决定等待时间，并限制在[ADAPTIVE_TIMEOUT_MIN, ADAPTIVE_TIMEOUT_MAX]内。
+    未等到只记入近期结果：未等到比例偏高时放宽1.5倍，连续未等到时每次再翻倍，
+    但放宽后不超过调用方给的默认值，避免可有可无的等待点越等越久。
+    元素可能根本不出现的探测性等待不要指定site
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.sites = None
+        self.pending = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _site(self, site):
+        if self.sites is None:
+            self.sites = self._load()
+        return self.sites.setdefault(site, {"success": [], "recent": []})
+
+    def _append(self, site, elapsed, ok):
+        stats = self._site(site)
+        if ok:
+            stats["success"] = (stats["success"] + [round(elapsed, 3)])[-ADAPTIVE_HISTORY:]
+        stats["recent"] = (stats["recent"] + [1 if ok else 0])[-ADAPTIVE_HISTORY:]
+        self.pending.setdefault(site, []).append((round(elapsed, 3), ok))
+
+    def record_success(self, site, elapsed):
+        with self.lock:
+            self._append(site, elapsed, True)
+
+    def record_miss(self, site):
+        with self.lock:
+            self._append(site, 0, False)
+
+    def timeout_for(self, site, default):
+        with self.lock:
+            stats = self._site(site)
+            samples = sorted(stats["success"])
+            if len(samples) < ADAPTIVE_MIN_SAMPLES:
+                return default
+            high = samples[min(len(samples) - 1, int(len(samples) * ADAPTIVE_PERCENTILE))]
+            factor, extra = ADAPTIVE_MARGIN
+            timeout = high * factor + extra
+            widen = 1
+            recent = stats["recent"][-10:]
+            if recent and recent.count(0) / len(recent) > 0.2:
+                widen *= 1.5
+            # 连续未等到说明真实耗时可能已超过当前截止时间，逐次翻倍直到成功一次
+            for ok in reversed(recent):
+                if ok:
+                    break
+                widen *= 2
+            if widen > 1:
+                timeout = max(timeout, min(timeout * widen, default))
+            return max(ADAPTIVE_TIMEOUT_MIN, min(ADAPTIVE_TIMEOUT_MAX, timeout))
+
+    def summary(self):
+        """各等待点当前的等待时间，用于日志"""
+        with self.lock:
+            names = list((self.sites or {}).keys())
+        return {name: round(self.timeout_for(name, 0), 1) for name in names}
+
+    def save(self):
+        """把本进程新增的记录合并写回文件，多个子进程可以各自保存"""
+        with self.lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path + ".lock", "w")
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            merged = self._load()
+            for site, entries in pending.items():
+                stats = merged.setdefault(site, {"success": [], "recent": []})
+                for elapsed, ok in entries:
+                    if ok:
+                        stats["success"].append(elapsed)
+                    stats["recent"].append(1 if ok else 0)
+                stats["success"] = stats["success"][-ADAPTIVE_HISTORY:]
+                stats["recent"] = stats["recent"][-ADAPTIVE_HISTORY:]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"保存等待时间统计失败: {e}")
+        finally:
+            lock_file.close()
+
+# v2起success中只有真实成功的耗时；旧文件混有未等到时的已等待时间，不再读取
+timeout_manager = TimeoutManager(os.path.join(STATE_DIR, "wait_timeouts_v2.json"))
+atexit.register(timeout_manager.save)
+
 # ========== 版本检测 ==========
 def get_chrome_version_main():
     """检测Chrome主版本号，优先使用环境变量，失败则尝试系统命令"""
@@ -112,9 +632,444 @@ def load_account_groups():
     raise FileNotFoundError("未找到账号配置，请设置环境变量 ACCOUNTS_CONFIG 或提供 accounts.json")
 
 
+# ========== 运行指标 ==========
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(LOG_DIR, "metrics.prom"))  # Prometheus textfile，空字符串为不写
+PHASE_BUCKETS = (5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+QUERY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+class Metrics:
+    """
+    进程内的计数器、当前值和直方图，按Prometheus文本格式输出。
+    隔离模式下子进程结束前导出自己的部分，由父进程合并
+    """
+
+    def __init__(self, prefix="bing_rewards"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.help = {}
+        self.kinds = {}
+        self.values = {}
+        self.histograms = {}
+
+    def _key(self, name, kind, help_text, labels):
+        self.kinds.setdefault(name, kind)
+        if help_text:
+            self.help.setdefault(name, help_text)
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, help_text="", amount=1, **labels):
+        with self.lock:
+            key = self._key(name, "counter", help_text, labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, help_text="", **labels):
+        with self.lock:
+            self.values[self._key(name, "gauge", help_text, labels)] = value
+
+    def set_max(self, name, value, help_text="", **labels):
+        with self.lock:
+            key = self._key(name, "gauge", help_text, labels)
+            self.values[key] = max(self.values.get(key, value), value)
+
+    def observe(self, name, value, help_text="", buckets=PHASE_BUCKETS, **labels):
+        with self.lock:
+            key = self._key(name, "histogram", help_text, labels)
+            hist = self.histograms.setdefault(key, {"buckets": list(buckets), "counts": [0] * len(buckets),
+                                                    "sum": 0.0, "count": 0})
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def total(self, name):
+        """某个计数器所有标签组合的合计"""
+        with self.lock:
+            return sum(value for (key, _), value in self.values.items() if key == name)
+
+    def clear(self, name):
+        """去掉某个指标的全部标签组合（如账号列表变化后的积分）"""
+        with self.lock:
+            for key in [key for key in self.values if key[0] == name]:
+                del self.values[key]
+
+    def export(self):
+        with self.lock:
+            return {
+                "help": dict(self.help),
+                "kinds": dict(self.kinds),
+                "values": [[name, list(labels), value] for (name, labels), value in self.values.items()],
+                "histograms": [[name, list(labels), hist] for (name, labels), hist in self.histograms.items()],
+            }
+
+    def merge(self, data):
+        """合并子进程导出的指标：计数器和直方图累加，当前值覆盖"""
+        with self.lock:
+            for name, kind in data["kinds"].items():
+                self.kinds.setdefault(name, kind)
+            for name, text in data["help"].items():
+                self.help.setdefault(name, text)
+            for name, labels, value in data["values"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                if self.kinds[name] == "counter":
+                    self.values[key] = self.values.get(key, 0) + value
+                else:
+                    self.values[key] = value
+            for name, labels, hist in data["histograms"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                own = self.histograms.get(key)
+                if own is None:
+                    self.histograms[key] = hist
+                    continue
+                own["counts"] = [a + b for a, b in zip(own["counts"], hist["counts"])]
+                own["sum"] += hist["sum"]
+                own["count"] += hist["count"]
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self):
+        """Prometheus文本格式"""
+        lines = []
+        with self.lock:
+            by_name = {}
+            for (name, labels), value in self.values.items():
+                by_name.setdefault(name, []).append((labels, value))
+            for (name, labels), hist in self.histograms.items():
+                by_name.setdefault(name, []).append((labels, hist))
+            for name in sorted(by_name):
+                full_name = f"{self.prefix}_{name}"
+                if name in self.help:
+                    lines.append(f"# HELP {full_name} {self.help[name]}")
+                lines.append(f"# TYPE {full_name} {self.kinds[name]}")
+                for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                    if self.kinds[name] != "histogram":
+                        lines.append(f"{full_name}{self._labels(labels)} {value}")
+                        continue
+                    for bound, count in zip(value["buckets"], value["counts"]):
+                        lines.append(f"{full_name}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{full_name}_bucket{self._labels(labels, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{full_name}_sum{self._labels(labels)} {value['sum']:.3f}")
+                    lines.append(f"{full_name}_count{self._labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=METRICS_FILE):
+        """原子写入，供node_exporter的textfile collector读取"""
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入指标文件失败: {e}")
+
+metrics = Metrics()
+
+@contextlib.contextmanager
+def measure_phase(phase):
+    """记录一个账号处理阶段的耗时，失败的阶段也计入"""
+    started = time.monotonic()
+    outcome = "error"
+    try:
+        with profiler.phase(phase):
+            yield
+        outcome = "ok"
+    finally:
+        metrics.observe("phase_duration_seconds", time.monotonic() - started,
+                        "账号处理各阶段耗时", phase=phase, outcome=outcome)
+
+def count_retry(kind):
+    metrics.inc("retries_total", "各类重试次数", kind=kind)
+
+def count_driver_restart(group_name, reason):
+    metrics.inc("driver_restarts_total", "Chrome重新启动次数", group=group_name, reason=reason)
+
+def record_chrome_memory(driver, group_name):
+    """记录该组Chrome进程树的峰值内存"""
+    pid = getattr(driver, "browser_pid", None)
+    if pid is None:
+        service = getattr(driver, "service", None)
+        pid = getattr(getattr(service, "process", None), "pid", None)
+    if pid:
+        metrics.set_max("chrome_memory_bytes", int(process_tree_memory_mb(pid) * 1024 * 1024),
+                        "本次运行中该组Chrome进程树的峰值内存（PSS之和）", group=group_name)
+
+def start_metrics_server(port=METRICS_PORT):
+    """在127.0.0.1上提供/metrics，返回server，端口为0时不启动"""
+    if not port:
+        return None
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"指标端口 {port} 启动失败: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"运行指标: http://127.0.0.1:{port}/metrics")
+    return server
+
+# ========== 性能剖析 ==========
+PROFILE_TOP = 25  # 报告中每个阶段列出的函数和分配位置数量
+# 按文件路径把CPU时间归类，回答"时间花在解析、日志还是和浏览器通信上"
+PROFILE_CATEGORIES = [
+    ("HTML解析(bs4)", ("bs4", "html/parser", "html5lib", "lxml")),
+    ("WebDriver通信", ("selenium", "urllib3", "http/client", "socket", "ssl")),
+    ("日志", ("logging",)),
+    ("JSON/正则", ("json", "re/", "sre_")),
+]
+
+class RunProfiler:
+    """
+    --profile时按阶段收集cProfile统计（按线程CPU时间计，不含等待浏览器的时间）
+    和tracemalloc分配差异。多个账号组并行时，分配差异会混入同时运行的其他组。
+    Python 3.12起cProfile基于sys.monitoring，整个进程同一时间只能启用一个，且记录所有线程，
+    因此只剖析先开始的阶段（其余只统计墙钟和内存），计时改用墙钟
+    """
+
+    PROCESS_WIDE = sys.version_info >= (3, 12)
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.wall = {}
+        self.unprofiled = {}
+        self.allocations = {}
+
+    def start(self):
+        import tracemalloc
+        tracemalloc.start()
+        self.enabled = True
+        logger.info("已启用性能剖析，结束时输出报告")
+
+    def _snapshot(self):
+        import tracemalloc
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        import cProfile
+        # 3.12+的Profile会收到所有线程的事件，按线程CPU时间计时会错乱
+        profile = cProfile.Profile() if self.PROCESS_WIDE else cProfile.Profile(time.thread_time)
+        before = self._snapshot()
+        started = time.monotonic()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool is already active：并行的其他组或外层阶段正在剖析
+            profile = None
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall = time.monotonic() - started
+            diff = self._snapshot().compare_to(before, "lineno")
+            self._add(name, profile, wall, diff)
+
+    def _add(self, name, profile, wall, diff):
+        import pstats
+        with self.lock:
+            if profile is None:
+                self.unprofiled[name] = self.unprofiled.get(name, 0) + 1
+            elif name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+            runs, total = self.wall.get(name, (0, 0.0))
+            self.wall[name] = (runs + 1, total + wall)
+            allocations = self.allocations.setdefault(name, {})
+            for stat in diff:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                key = f"{frame.filename}:{frame.lineno}"
+                size, count = allocations.get(key, (0, 0))
+                allocations[key] = (size + stat.size_diff, count + stat.count_diff)
+
+    @staticmethod
+    def _categories(stats):
+        totals = {label: 0.0 for label, _ in PROFILE_CATEGORIES}
+        for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+            path = filename.replace("\\", "/")
+            for label, markers in PROFILE_CATEGORIES:
+                if any(marker in path for marker in markers):
+                    totals[label] += tottime
+                    break
+        return totals
+
+    def write_report(self, out_dir):
+        """写出每个阶段和合计的.prof文件（可用pstats/snakeviz加载）及文本报告，返回报告路径"""
+        import io
+        import pstats
+        import tracemalloc
+        if not self.enabled:
+            return None
+        os.makedirs(out_dir, exist_ok=True)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report = io.StringIO()
+        report.write(f"tracemalloc峰值: {peak / 1024 / 1024:.1f} MB\n")
+        if self.PROCESS_WIDE:
+            report.write("Python 3.12+：同一时间只剖析一个阶段，耗时为墙钟且包含同期其他线程，不能按线程区分CPU时间\n")
+        report.write(f"\n{'阶段':<28}{'次数':>6}{'未剖析':>8}{'墙钟(s)':>12}{'CPU(s)':>10}{'CPU占比':>9}\n")
+        with self.lock:
+            for name in sorted(self.wall):
+                runs, wall = self.wall[name]
+                skipped = self.unprofiled.get(name, 0)
+                if name not in self.stats:
+                    report.write(f"{name:<28}{runs:>6}{skipped:>8}{wall:>12.1f}{'-':>10}{'-':>9}\n")
+                    continue
+                stats = self.stats[name]
+                share = stats.total_tt / wall if wall else 0
+                report.write(f"{name:<28}{runs:>6}{skipped:>8}{wall:>12.1f}{stats.total_tt:>10.2f}{share:>9.1%}\n")
+            phases = sorted(self.stats)
+            combined = pstats.Stats()
+            for name in phases:
+                stats = self.stats[name]
+                file_name = re.sub(r"[^\w.-]", "_", name) + ".prof"
+                stats.dump_stats(os.path.join(out_dir, file_name))
+                combined.add(stats)
+            combined.dump_stats(os.path.join(out_dir, "all.prof"))
+            for name in phases:
+                stats = self.stats[name]
+                report.write(f"\n===== {name} =====\nCPU时间归类:\n")
+                for label, seconds in self._categories(stats).items():
+                    report.write(f"  {label}: {seconds:.3f}s\n")
+                report.write(f"\n按累计CPU时间排序的前{PROFILE_TOP}个函数:\n")
+                stats.stream = report
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+                report.write(f"新增内存最多的前{PROFILE_TOP}个位置:\n")
+                top = sorted(self.allocations[name].items(), key=lambda item: item[1][0], reverse=True)
+                for location, (size, count) in top[:PROFILE_TOP]:
+                    report.write(f"  {size / 1024:>10.1f} KB {count:>8} 块  {location}\n")
+        path = os.path.join(out_dir, "report.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        return path
+
+profiler = RunProfiler()
+
+# ========== 调试文件 ==========
+class ArtifactStore:
+    """
+    调试截图和页面源码的存储：按账号组、账号和阶段命名，内容相同只保存一份，
+    HTML压缩保存，总大小超出预算时按修改时间从旧到新删除。
+    哈希、压缩和写盘都在后台线程完成，调用线程只负责从浏览器取数据
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact")
+        self.known_hashes = None
+
+    def save_screenshot(self, driver, phase):
+        """截图并异步保存，返回Future（结果为最终文件路径）"""
+        return self.submit(driver.get_screenshot_as_png(), phase, ".png")
+
+    def save_page_source(self, driver, phase):
+        """抓取页面源码并异步压缩保存"""
+        return self.submit(driver.page_source.encode("utf-8"), phase, ".html.gz", compress=True)
+
+    def submit(self, data, phase, suffix, compress=False):
+        group_name = getattr(_log_context, "group", None) or "nogroup"
+        account = getattr(_log_context, "account", None) or "noaccount"
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        prefix = "_".join(re.sub(r"[^\w.-]", "_", str(part)) for part in (group_name, account, phase, timestamp))
+        return self.executor.submit(self._write, data, prefix, suffix, compress)
+
+    def _load_hashes(self):
+        # 文件名末尾是内容哈希，重启后仍能去重
+        self.known_hashes = {}
+        for name in os.listdir(self.root):
+            match = re.search(r"_([0-9a-f]{16})\.", name)
+            if match:
+                self.known_hashes[match.group(1)] = os.path.join(self.root, name)
+
+    def _write(self, data, prefix, suffix, compress):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            if self.known_hashes is None:
+                self._load_hashes()
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            existing = self.known_hashes.get(digest)
+            if existing and os.path.exists(existing):
+                os.utime(existing)
+                logger.info(f"[Debug] 调试文件内容未变化，沿用: {existing}")
+                return existing
+            path = os.path.join(self.root, f"{prefix}_{digest}{suffix}")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(data) if compress else data)
+            os.replace(tmp_path, path)
+            self.known_hashes[digest] = path
+            logger.info(f"[Debug] 已保存调试文件: {path}")
+            self._enforce_budget()
+            return path
+        except Exception as e:
+            logger.warning(f"[Debug] 保存调试文件失败: {e}")
+            return None
+
+    def _enforce_budget(self):
+        entries = []
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            if os.path.isfile(full):
+                st = os.stat(full)
+                entries.append((st.st_mtime, st.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+                total -= size
+                logger.info(f"[Debug] 调试文件超出磁盘预算，已删除: {full}")
+            except OSError:
+                pass
+        self.known_hashes = {h: p for h, p in self.known_hashes.items() if os.path.exists(p)}
+
+    def flush(self, timeout=30):
+        """等待已提交的写入完成"""
+        try:
+            self.executor.submit(lambda: None).result(timeout=timeout)
+        except Exception:
+            pass
+
+artifact_store = ArtifactStore(ARTIFACT_DIR, ARTIFACT_MAX_BYTES)
+atexit.register(artifact_store.flush)
+
 def log_password_debug_info(driver, group_name, email):
     """在无法找到密码输入框时采集调试信息"""
-    timestamp = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     logger.error(f"[Debug] 密码输入框未找到 - 账号组: {group_name}, 邮箱: {email}")
     try:
         logger.error(f"[Debug] 当前URL: {driver.current_url}")
@@ -142,47 +1097,319 @@ def log_password_debug_info(driver, group_name, email):
     except Exception as e:
         logger.warning(f"[Debug] 收集输入框信息失败: {e}")
 
-    # 输出页面源码片段，最多2000字符
+    # 页面源码压缩保存到调试目录，不再写入主日志
     try:
-        page_source = driver.page_source
-        snippet = page_source[:2000]
-        logger.error("[Debug] 页面源码片段(前2000字符):\n" + snippet)
+        artifact_store.save_page_source(driver, "password_debug")
     except Exception as e:
         logger.warning(f"[Debug] 获取页面源码失败: {e}")
 
     # 保存截图便于排查
     try:
-        screenshot_name = f"password_debug_{group_name}_{timestamp}.png"
-        driver.save_screenshot(screenshot_name)
-        logger.error(f"[Debug] 已保存调试截图: {screenshot_name}")
+        artifact_store.save_screenshot(driver, "password_debug")
     except Exception as e:
         logger.warning(f"[Debug] 保存调试截图失败: {e}")
 
-# ========== 工具函数 ==========
-def check_driver_connection(driver, group_name):
-    """检查WebDriver连接是否正常"""
+# ========== 会话健康 ==========
+CONNECTION_ERROR_MARKERS = (
+    "Failed to establish a new connection",
+    "HTTPConnectionPool",
+    "invalid session id",
+    "DevTools连接已断开",
+)
+
+def is_connection_error(e):
+    """判断异常是否意味着WebDriver会话已断开"""
+    return any(marker in str(e) for marker in CONNECTION_ERROR_MARKERS)
+
+class SessionHealth:
+    """
+    根据实际执行命令的结果推断会话是否存活，
+    只有在失败之后或空闲过久时才发送current_url探测
+    """
+
+    def __init__(self):
+        self.last_ok = time.monotonic()
+        self.failed = False
+        self.probes = 0
+        self.skipped_probes = 0
+
+    def record_success(self):
+        self.last_ok = time.monotonic()
+        self.failed = False
+
+    def record_failure(self, e):
+        if is_connection_error(e):
+            self.failed = True
+
+    def is_alive(self, driver, group_name):
+        if not self.failed and time.monotonic() - self.last_ok < HEALTH_IDLE_PROBE_SECONDS:
+            self.skipped_probes += 1
+            return True
+        self.probes += 1
+        try:
+            # 探测命令本身会经过execute钩子更新状态
+            driver.current_url
+            return True
+        except Exception as e:
+            self.failed = True
+            logger.warning(f"账号组 {group_name} WebDriver连接检查失败: {e}")
+            return False
+
+def attach_session_health(driver):
+    """包装driver.execute，让每条命令的结果都更新会话健康状态"""
+    health = SessionHealth()
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        try:
+            result = original_execute(driver_command, params)
+        except Exception as e:
+            # 非连接类异常（如找不到元素）说明会话仍有响应
+            if is_connection_error(e):
+                health.record_failure(e)
+            else:
+                health.record_success()
+            raise
+        health.record_success()
+        return result
+
+    driver.execute = execute
+    driver._session_health = health
+    return health
+
+def get_session_health(driver):
+    health = getattr(driver, "_session_health", None)
+    if health is None:
+        health = attach_session_health(driver)
+    return health
+
+# ========== 静态资源缓存 ==========
+STATIC_ASSET_RE = re.compile(r"\.(?:js|css|woff2?|ttf|otf|svg|png|jpe?g|gif|ico|webp)$", re.I)
+SIMPLE_CACHE_MAGIC = 0xfcfb6d1ba7725c30
+SIMPLE_CACHE_ENTRY_RE = re.compile(r"^([0-9a-f]{16})_[01s]$")
+
+ASSET_STATS_JS = """
+var pattern = /\\.(js|css|woff2?|ttf|otf|svg|png|jpe?g|gif|ico|webp)(\\?|$)/i;
+var stats = {requests: 0, hits: 0, unknown: 0, bytes_saved: 0, bytes_downloaded: 0};
+performance.getEntriesByType('resource').forEach(function(entry) {
+    if (!pattern.test(entry.name.split('#')[0])) { return; }
+    stats.requests++;
+    // 跨域且未返回Timing-Allow-Origin时大小都为0，无法判断是否来自缓存
+    if (!entry.decodedBodySize) { stats.unknown++; return; }
+    if (entry.transferSize === 0) {
+        stats.hits++;
+        stats.bytes_saved += entry.encodedBodySize;
+    } else {
+        stats.bytes_downloaded += entry.transferSize;
+    }
+});
+return stats;
+"""
+
+def simple_cache_entry_url(path):
+    """读取Chrome simple cache条目文件头中的缓存键，返回其中的URL，无法识别时返回None"""
     try:
-        # 尝试获取当前URL，如果失败说明连接已断开
-        driver.current_url
-        return True
+        with open(path, "rb") as f:
+            header = f.read(20)
+            if len(header) < 20:
+                return None
+            magic = int.from_bytes(header[:8], "little")
+            key_length = int.from_bytes(header[12:16], "little")
+            if magic != SIMPLE_CACHE_MAGIC or key_length > 64 * 1024:
+                return None
+            key = f.read(key_length).decode("utf-8", "replace")
+    except OSError:
+        return None
+    # 新版Chrome的键带有"1/0/_dk_<站点> <站点> "等前缀，URL在最后
+    return key.rsplit(" ", 1)[-1]
+
+def is_static_asset(url):
+    path = url.split("#", 1)[0].split("?", 1)[0]
+    return bool(STATIC_ASSET_RE.search(path))
+
+class AssetCache:
+    """
+    可选的跨运行共享磁盘缓存，只保留JS/CSS/字体/图片等静态资源。
+    Chrome的磁盘缓存不能被多个实例同时使用，因此分成若干槽位，每个Chrome独占一个；
+    Cookie和本地存储仍在每次启动新建的临时用户目录中，随浏览器关闭删除
+    """
+
+    def __init__(self, root, max_bytes, enabled):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.slots = {}
+
+    def acquire(self):
+        """返回一个空闲槽位目录，本进程其他线程和其他进程都不会同时使用"""
+        with self.lock:
+            for index in itertools.count():
+                slot = os.path.join(self.root, f"slot{index}")
+                if slot in self.slots:
+                    continue
+                lock_file = self._lock(slot)
+                if lock_file:
+                    self.slots[slot] = lock_file
+                    break
+        # 上次使用该槽位的进程可能被强制结束，没来得及清理
+        self._clean(slot)
+        return slot
+
+    def release(self, slot):
+        """浏览器关闭后清理槽位，再交还"""
+        self._clean(slot)
+        with self.lock:
+            lock_file = self.slots.pop(slot, None)
+        if lock_file:
+            lock_file.close()
+
+    def _lock(self, slot, create=True, shared_only=False):
+        """
+        非阻塞地独占槽位，被其他进程占用时返回None。
+        没有fcntl的平台无法判断占用，shared_only时一律按占用处理
+        """
+        if create:
+            os.makedirs(slot, exist_ok=True)
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is None and shared_only:
+            return None
+        lock_file = open(os.path.join(slot, ".lock"), "w")
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def _clean(self, slot):
+        """删除非静态资源条目，再按总大小淘汰最旧的文件"""
+        try:
+            self._prune(slot)
+            self._enforce_budget(slot)
+        except OSError as e:
+            logger.warning(f"清理静态资源缓存失败: {e}")
+
+    def _prune(self, slot):
+        removed = 0
+        for directory, _, names in os.walk(slot):
+            groups = {}
+            for name in names:
+                match = SIMPLE_CACHE_ENTRY_RE.match(name)
+                if match:
+                    groups.setdefault(match.group(1), []).append(name)
+            for entry_hash, files in groups.items():
+                url = simple_cache_entry_url(os.path.join(directory, f"{entry_hash}_0"))
+                if url and is_static_asset(url):
+                    continue
+                for name in files:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                        removed += 1
+                    except OSError:
+                        pass
+        if removed:
+            logger.info(f"静态资源缓存: 已删除 {removed} 个非静态资源缓存文件")
+
+    def _enforce_budget(self, slot):
+        """
+        总大小计入所有槽位，但只删除自己持有的slot和能临时锁住的空闲槽位中的文件，
+        正在被其他Chrome使用的槽位不动
+        """
+        files = []
+        total = 0
+        borrowed = []
+        try:
+            for name in sorted(os.listdir(self.root)):
+                path = os.path.join(self.root, name)
+                if not os.path.isdir(path):
+                    continue
+                with self.lock:
+                    in_use = path in self.slots
+                owned = path == slot
+                if not owned and not in_use:
+                    lock_file = self._lock(path, create=False, shared_only=True)
+                    if lock_file:
+                        borrowed.append(lock_file)
+                        owned = True
+                for directory, _, names in os.walk(path):
+                    for file_name in names:
+                        if file_name == ".lock":
+                            continue
+                        file_path = os.path.join(directory, file_name)
+                        try:
+                            stat = os.stat(file_path)
+                        except OSError:
+                            continue
+                        total += stat.st_size
+                        if owned:
+                            files.append((stat.st_mtime, stat.st_size, file_path))
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        finally:
+            for lock_file in borrowed:
+                lock_file.close()
+
+asset_cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES, ASSET_CACHE)
+
+def record_asset_cache(driver, site):
+    """统计当前页面静态资源的缓存命中情况（未启用共享缓存时也统计，作为对照）"""
+    try:
+        stats = driver.execute_script(ASSET_STATS_JS) or {}
     except Exception as e:
-        logger.warning(f"账号组 {group_name} WebDriver连接检查失败: {e}")
-        return False
+        if is_connection_error(e):
+            raise
+        logger.warning(f"统计静态资源缓存失败: {e}")
+        return
+    metrics.inc("asset_requests_total", "静态资源请求数", stats.get("requests", 0), site=site)
+    metrics.inc("asset_cache_hits_total", "来自缓存的静态资源数", stats.get("hits", 0), site=site)
+    metrics.inc("asset_unknown_total", "无法判断是否命中缓存的跨域静态资源数", stats.get("unknown", 0), site=site)
+    metrics.inc("asset_bytes_saved_total", "缓存命中省下的静态资源字节数", stats.get("bytes_saved", 0), site=site)
+    metrics.inc("asset_bytes_downloaded_total", "实际下载的静态资源字节数", stats.get("bytes_downloaded", 0), site=site)
+
+def asset_cache_totals():
+    return {name: metrics.total(f"asset_{name}_total")
+            for name in ("requests", "cache_hits", "unknown", "bytes_saved", "bytes_downloaded")}
+
+def asset_cache_summary(before):
+    """本次运行的静态资源缓存命中率和节省字节数"""
+    after = asset_cache_totals()
+    delta = {name: after[name] - before[name] for name in after}
+    known = delta["requests"] - delta["unknown"]
+    hit_rate = delta["cache_hits"] / known if known else 0
+    mode = "共享缓存" if asset_cache.enabled else "未启用共享缓存"
+    return (f"静态资源({mode}): 请求 {delta['requests']} 个，可判断 {known} 个，命中率 {hit_rate:.1%}，"
+            f"节省 {delta['bytes_saved'] / 1024 / 1024:.1f} MB，下载 {delta['bytes_downloaded'] / 1024 / 1024:.1f} MB")
+
+# ========== 工具函数 ==========
+def check_driver_connection(driver, group_name):
+    """检查WebDriver连接是否正常，近期有成功命令时不再额外探测"""
+    return get_session_health(driver).is_alive(driver, group_name)
 
 def safe_driver_operation(driver, group_name, operation_name, operation_func):
     """安全执行driver操作，如果连接断开则重新创建"""
     try:
         return operation_func()
     except Exception as e:
-        if "Failed to establish a new connection" in str(e) or "HTTPConnectionPool" in str(e) or "invalid session id" in str(e):
+        if is_connection_error(e):
             logger.warning(f"账号组 {group_name} {operation_name} 时检测到连接问题: {e}")
             return None
         else:
             raise e
 
-def wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT):
+def wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT, site=None):
     try:
-        btn = WebDriverWait(driver, timeout).until(
+        btn = wait_for(driver, timeout, site or f"click:{value}"[:80]).until(
             EC.element_to_be_clickable((by, value))
         )
         btn.click()
@@ -191,9 +1418,9 @@ def wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT):
         logger.error(f"点击 {value} 失败: {e}")
         return False
 
-def wait_and_type(driver, by, value, text, timeout=WAIT_TIMEOUT):
+def wait_and_type(driver, by, value, text, timeout=WAIT_TIMEOUT, site=None):
     try:
-        inp = WebDriverWait(driver, timeout).until(
+        inp = wait_for(driver, timeout, site or f"type:{value}"[:80]).until(
             EC.visibility_of_element_located((by, value))
         )
         inp.clear()
@@ -203,7 +1430,9 @@ def wait_and_type(driver, by, value, text, timeout=WAIT_TIMEOUT):
         logger.error(f"输入 {value} 失败: {e}")
         return False
 
-def robust_wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT, retries=RETRY_COUNT):
+def robust_wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT, retries=RETRY_COUNT, site=None, adaptive=True):
+    """adaptive=False用于按钮可能根本不存在的探测，等待时间固定为timeout，也不记入统计"""
+    site = (site or f"click:{value}"[:80]) if adaptive else None
     for attempt in range(retries):
         try:
             # 检查连接是否正常
@@ -211,39 +1440,164 @@ def robust_wait_and_click(driver, by, value, timeout=WAIT_TIMEOUT, retries=RETRY
                 logger.warning(f"WebDriver连接已断开，无法点击 {value}")
                 return False
                 
-            btn = WebDriverWait(driver, timeout).until(
+            btn = wait_for(driver, timeout, site).until(
                 EC.element_to_be_clickable((by, value))
             )
             btn.click()
             return True
         except Exception as e:
             # 检查是否是连接问题
-            if "Failed to establish a new connection" in str(e) or "HTTPConnectionPool" in str(e) or "invalid session id" in str(e):
+            if is_connection_error(e):
                 logger.warning(f"WebDriver连接问题，无法继续点击 {value}: {e}")
                 return False
                 
             logger.warning(f"重试点击 {value} 第{attempt+1}次失败: {e}")
             if attempt < retries - 1:  # 不是最后一次尝试
-                time.sleep(2)
+                count_retry("click")
+                interruptible_sleep(2)
             else:
                 # 最后一次尝试，截图保存
                 try:
-                    screenshot_name = f"click_fail.png"
-                    driver.save_screenshot(screenshot_name)
-                    logger.info(f"点击失败截图已保存: {screenshot_name}")
+                    artifact_store.save_screenshot(driver, "click_fail")
                 except Exception as screenshot_error:
                     logger.warning(f"截图保存失败: {screenshot_error}")
     return False
 
-def handle_stay_signed_in_popup(driver, idx):
+# ========== 弹窗监视 ==========
+# 注入到每个文档（含iframe）的监视脚本：只在登录域名下工作，按PAGE_STATE_MARKERS识别
+# "保持登录状态"和"创建通行密钥"弹窗，找到带明确文字的按钮后在所在frame内点击，
+# 结果汇总到顶层窗口供Python一次读取。点击后即停止监听
+
+POPUP_WATCHER_TEMPLATE = r"""
+(function(RULES, HOSTS) {
+    if (window.__bingPopupWatcher) { return; }
+    var state = window.__bingPopupWatcher = {found: [], clicked: []};
+    var host = location.hostname;
+    var onLoginHost = HOSTS.some(function(h) {
+        return host === h || host.slice(-h.length - 1) === '.' + h;
+    });
+    if (!onLoginHost) { return; }
+    var record = function(list, entry) {
+        if (window === window.top) {
+            state[list].push(entry);
+        } else {
+            try { window.top.postMessage({__bingPopup: list, entry: entry}, '*'); } catch (e) {}
+        }
+    };
+    var isVisible = function(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); };
+    var findButton = function(rule) {
+        var candidates = document.querySelectorAll('button, input[type="submit"], input[type="button"], [role="button"]');
+        for (var i = 0; i < candidates.length; i++) {
+            var el = candidates[i];
+            var label = ((el.innerText || el.value || '') + '').trim();
+            if (rule.buttons.indexOf(label) !== -1 && isVisible(el) && !el.disabled) { return el; }
+        }
+        return null;
+    };
+    var seen = {};
+    var handled = {};
+    var observer = null;
+    var scan = function() {
+        var text = document.body ? (document.body.innerText || '').toLowerCase() : '';
+        RULES.forEach(function(rule) {
+            if (handled[rule.kind]) { return; }
+            // 与classify_page_text相同：任一组关键词全部出现即命中
+            var matched = rule.markers.filter(function(terms) {
+                return terms.every(function(term) { return text.indexOf(term) !== -1; });
+            })[0];
+            if (!matched) { return; }
+            if (!seen[rule.kind]) {
+                // 文字出现即记录，按钮找不到时Python端据此知道弹窗存在
+                seen[rule.kind] = true;
+                record('found', {kind: rule.kind, text: matched.join(' '), frame: window !== window.top});
+            }
+            var btn = findButton(rule);
+            if (!btn) { return; }
+            handled[rule.kind] = true;
+            btn.click();
+            record('clicked', {kind: rule.kind, button: ((btn.innerText || btn.value || '') + '').trim()});
+        });
+        // 每个登录页面最多一个弹窗，点击过即停止监听，避免之后每次DOM变化都读取全文
+        if (observer && Object.keys(handled).length) {
+            observer.disconnect();
+            observer = null;
+        }
+    };
+    var pending = false;
+    var schedule = function() {
+        if (pending) { return; }
+        pending = true;
+        setTimeout(function() { pending = false; scan(); }, 100);
+    };
+    if (window === window.top) {
+        window.addEventListener('message', function(e) {
+            if (e.data && e.data.__bingPopup && state[e.data.__bingPopup]) {
+                state[e.data.__bingPopup].push(e.data.entry);
+            }
+        });
+    }
+    observer = new MutationObserver(schedule);
+    observer.observe(document.documentElement || document, {childList: true, subtree: true, characterData: true});
+    schedule();
+})(%s, %s);
+"""
+
+def popup_watcher_js():
+    """由PAGE_STATE_MARKERS和POPUP_BUTTONS生成监视脚本，识别规则与登录流程中的判断一致"""
+    rules = [{"kind": kind, "buttons": buttons,
+              "markers": [[term.lower() for term in terms] for terms in PAGE_STATE_MARKERS[kind]]}
+             for kind, buttons in POPUP_BUTTONS.items()]
+    return POPUP_WATCHER_TEMPLATE % (json.dumps(rules, ensure_ascii=False), json.dumps(POPUP_WATCH_HOSTS))
+
+READ_POPUP_WATCHER_JS = """
+var state = window.__bingPopupWatcher;
+return state ? {found: state.found.slice(), clicked: state.clicked.slice()} : null;
+"""
+
+def install_popup_watcher(driver):
+    """为之后的每个新文档注册监视脚本，并在当前页面立即注入一次"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": popup_watcher_js()})
+    except Exception as e:
+        logger.warning(f"注册弹窗监视脚本失败，将按页面注入: {e}")
+    try:
+        driver.execute_script(popup_watcher_js())
+    except Exception as e:
+        logger.warning(f"注入弹窗监视脚本失败: {e}")
+
+def read_popup_watcher(driver):
+    """一次调用读取当前页面监视到的弹窗及点击记录"""
+    try:
+        return driver.execute_script(READ_POPUP_WATCHER_JS)
+    except Exception as e:
+        if is_connection_error(e):
+            raise
+        return None
+
+def handle_stay_signed_in_popup(driver, idx, timeout=POPUP_WATCH_SECONDS):
     """
     专门处理"保持登录状态"弹窗的函数
+    优先读取页面内监视脚本的结果，监视脚本没有点击时再逐frame查找按钮
     """
     try:
-        # 等待弹窗出现
-        time.sleep(3)
-        
-        # 检查是否有iframe
+        state = None
+        deadline = time.monotonic() + timeout
+        while True:
+            state = read_popup_watcher(driver)
+            if state is None:
+                # 当前页面尚未注入监视脚本（例如CDP注册失败）
+                driver.execute_script(popup_watcher_js())
+            elif any(c.get("kind") == "stay_signed_in" for c in state.get("clicked", [])):
+                logger.info("弹窗监视脚本已点击'保持登录状态'弹窗")
+                return True
+            if time.monotonic() >= deadline:
+                break
+            interruptible_sleep(0.5)
+
+        found = state and any(f.get("kind") == "stay_signed_in" for f in state.get("found", []))
+        if found:
+            logger.info("监视脚本发现'保持登录状态'弹窗但未能点击，逐frame查找按钮")
+        # 跨域iframe中的监视脚本可能无法注入或回报，未点击时总是逐frame再找一遍
         iframes = driver.find_elements(By.TAG_NAME, "iframe")
         for iframe in iframes:
             try:
@@ -302,12 +1656,12 @@ def handle_popup_in_frame(driver):
                     
                     for selector in yes_selectors:
                         try:
-                            yes_btn = WebDriverWait(driver, 3).until(
+                            yes_btn = wait_for(driver, 3).until(
                                 EC.element_to_be_clickable((By.XPATH, selector))
                             )
                             # 滚动到元素位置
                             driver.execute_script("arguments[0].scrollIntoView(true);", yes_btn)
-                            time.sleep(0.5)
+                            interruptible_sleep(0.5)
                             
                             # 尝试点击
                             try:
@@ -334,7 +1688,7 @@ def handle_popup_in_frame(driver):
                     
                     for selector in no_selectors:
                         try:
-                            no_btn = WebDriverWait(driver, 2).until(
+                            no_btn = wait_for(driver, 2).until(
                                 EC.element_to_be_clickable((By.XPATH, selector))
                             )
                             driver.execute_script("arguments[0].click();", no_btn)
@@ -354,11 +1708,12 @@ def handle_popup_in_frame(driver):
 
 def click_login_button(driver, idx):
     # 1. 先用id
-    if robust_wait_and_click(driver, By.ID, "id_l"):
+    # 三种方式依次尝试，前面的找不到是常态，不参与自适应
+    if robust_wait_and_click(driver, By.ID, "id_l", adaptive=False):
         logger.info("用ID方式点击登录按钮成功")
         return True
     # 2. 用class
-    if robust_wait_and_click(driver, By.CSS_SELECTOR, "a.id_button"):
+    if robust_wait_and_click(driver, By.CSS_SELECTOR, "a.id_button", adaptive=False):
         logger.info("用class方式点击登录按钮成功")
         return True
     # 3. 用多语言文本和aria-label
@@ -370,12 +1725,17 @@ def click_login_button(driver, idx):
         "|//button[contains(@aria-label, '登录') or contains(@aria-label, 'Sign in') or contains(@aria-label, '登入')]"
         "|//button[contains(text(), '登录') or contains(text(), 'Sign in') or contains(text(), '登入')]"
     )
-    if robust_wait_and_click(driver, By.XPATH, xpath):
+    if robust_wait_and_click(driver, By.XPATH, xpath, adaptive=False):
         logger.info("用多语言文本方式点击登录按钮成功")
         return True
     logger.error("所有方式都未能点击登录按钮")
     return False
 
+DEFAULT_SEARCH_WORDS = [
+    "python", "bing", "ai", "chatgpt", "微软", "天气", "NBA", "世界杯", "科技新闻", "人工智能",
+    "股票", "电影", "电视剧", "旅游", "健康", "教育", "汽车", "手机", "数码", "美食", "历史", "地理", "音乐", "游戏", "动漫"
+]
+
 def get_bing_hotwords():
     logger.info("开始获取热搜关键词...")
     try:
@@ -399,14 +1759,166 @@ def get_bing_hotwords():
     except Exception as e:
         logger.warning(f"获取微博热搜失败：{e}")
     logger.info("使用默认搜索关键词")
-    return [
-        "python", "bing", "ai", "chatgpt", "微软", "天气", "NBA", "世界杯", "科技新闻", "人工智能",
-        "股票", "电影", "电视剧", "旅游", "健康", "教育", "汽车", "手机", "数码", "美食", "历史", "地理", "音乐", "游戏", "动漫"
-    ]
+    return list(DEFAULT_SEARCH_WORDS)
 
 
 
-# ========== 业务逻辑 ==========
+# ========== 批量DOM查询 ==========
+# 所有过滤都在页面内完成，一次execute_script返回元素及其元数据
+REWARD_CARDS_JS = """
+var isVisible = function(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); };
+return Array.from(document.querySelectorAll('.c-card-content a'))
+    .filter(function(a) { return a.querySelector('.mee-icon-AddMedium') && isVisible(a); })
+    .map(function(a) {
+        return {
+            element: a,
+            href: a.getAttribute('href') || '',
+            text: (a.innerText || '').trim().slice(0, 80),
+            newWindow: a.target === '_blank'
+        };
+    });
+"""
+
+SIGN_IN_BUTTONS_JS = """
+var keywords = ['签到', 'Sign in', 'Check-in'];
+var isVisible = function(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); };
+return Array.from(document.querySelectorAll('button'))
+    .filter(function(btn) {
+        var text = btn.textContent || '';
+        return keywords.some(function(k) { return text.indexOf(k) !== -1; })
+            && isVisible(btn) && !btn.disabled;
+    })
+    .map(function(btn) {
+        return {element: btn, text: (btn.innerText || '').trim().slice(0, 80)};
+    });
+"""
+
+def query_elements(driver, script, *args):
+    """执行批量查询脚本，返回[{element, ...元数据}]，失败时返回空列表"""
+    try:
+        return driver.execute_script(script, *args) or []
+    except Exception as e:
+        if is_connection_error(e):
+            raise
+        logger.warning(f"批量DOM查询失败: {e}")
+        return []
+
+def find_reward_cards(driver):
+    """一次返回所有可见且带'+'图标的积分任务卡片"""
+    return query_elements(driver, REWARD_CARDS_JS)
+
+def find_sign_in_buttons(driver):
+    """一次返回所有可见且可用的签到按钮"""
+    return query_elements(driver, SIGN_IN_BUTTONS_JS)
+
+def close_new_windows(driver, original_window, known_handles):
+    """关闭known_handles之外的窗口并切回原窗口，返回关闭数量；没有新窗口时只查询一次window_handles"""
+    new_handles = [handle for handle in driver.window_handles if handle not in known_handles]
+    if not new_handles:
+        return 0
+    for handle in new_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(original_window)
+    return len(new_handles)
+
+# 页面查询：在浏览器内完成判断，只传回结果和整页大小（用于统计省下的传输量），
+# 不再通过page_source把整页HTML传回Python
+PAGE_QUERY_WRAPPER_JS = """
+var html = document.documentElement.outerHTML;
+var result = (function(html, args) {
+%s
+})(html, arguments);
+return {result: result, page_bytes: new Blob([html]).size};
+"""
+
+PAGE_STATE_QUERY_JS = PAGE_QUERY_WRAPPER_JS % """
+var text = html.toLowerCase();
+var markers = args[0];
+return Object.keys(markers).filter(function(state) {
+    return markers[state].some(function(terms) {
+        return terms.every(function(term) { return text.indexOf(term) >= 0; });
+    });
+});
+"""
+
+BING_POINTS_QUERY_JS = PAGE_QUERY_WRAPPER_JS % """
+var match = html.match(/"availablePoints"\\s*:\\s*(\\d+)/);
+var today = null;
+var labels = document.querySelectorAll('p[title="今日积分"]');
+for (var i = 0; i < labels.length && today === null; i++) {
+    var span = document.evaluate(
+        '(descendant::span[@aria-label] | following::span[@aria-label])[1]',
+        labels[i], null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var label = span ? span.getAttribute('aria-label').trim() : '';
+    if (/^\\d+$/.test(label)) { today = label; }
+}
+return [match ? match[1] : null, today];
+"""
+
+PC_SEARCH_PROGRESS_QUERY_JS = PAGE_QUERY_WRAPPER_JS % """
+var detail = "contains(concat(' ', normalize-space(@class), ' '), ' pointsDetail ')";
+var links = document.getElementsByTagName('a');
+for (var i = 0; i < links.length; i++) {
+    if (links[i].textContent.trim() !== '电脑搜索' || !links[i].parentElement) { continue; }
+    var p = document.evaluate(
+        '(descendant::p[' + detail + '] | following::p[' + detail + '])[1]',
+        links[i].parentElement, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var b = p ? p.querySelector('b') : null;
+    var current = b ? b.textContent.trim() : '';
+    if (!/^\\d+$/.test(current)) { continue; }
+    var total = p.textContent.match(/\\/\\s*(\\d+)/);
+    if (total) { return [current, total[1]]; }
+}
+return [null, null];
+"""
+
+def page_query(driver, site, script, *args):
+    """执行页面查询脚本，记录返回大小、整页大小和耗时，返回查询结果"""
+    started = time.perf_counter()
+    response = driver.execute_script(script, *args)
+    elapsed = time.perf_counter() - started
+    result = response["result"]
+    returned = len(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+    page_bytes = response.get("page_bytes") or 0
+    metrics.observe("page_query_seconds", elapsed, "页面查询耗时", buckets=QUERY_BUCKETS, site=site)
+    metrics.inc("page_query_response_bytes_total", "页面查询返回的字节数", returned, site=site)
+    metrics.inc("page_source_bytes_avoided_total", "改用页面查询后不再传输的整页HTML字节数", page_bytes, site=site)
+    logger.info(f"页面查询 {site}: 返回 {returned} 字节（整页 {page_bytes / 1024:.0f} KB 未传输），用时 {elapsed * 1000:.0f} ms")
+    return result
+
+def query_with_fallback(driver, site, script, parse, *args):
+    """页面查询失败（如脚本被页面策略拦截）时退回到page_source加Python解析"""
+    try:
+        return page_query(driver, site, script, *args)
+    except Exception as e:
+        if is_connection_error(e):
+            raise
+        logger.warning(f"页面查询 {site} 失败，改用页面源码解析: {e}")
+        return parse(driver.page_source)
+
+def page_state_markers():
+    """传给PAGE_STATE_QUERY_JS的规则，统一转为小写"""
+    return {state: [[term.lower() for term in terms] for terms in alternatives]
+            for state, alternatives in PAGE_STATE_MARKERS.items()}
+
+def query_page_states(driver, site):
+    """识别登录流程中的中间页面，返回命中的状态集合，规则与classify_page_text相同"""
+    states = query_with_fallback(driver, site, PAGE_STATE_QUERY_JS, classify_page_text, page_state_markers())
+    return set(states)
+
+def query_bing_points(driver):
+    """返回(总积分, 今日积分)，规则与parse_bing_points相同"""
+    total_points, today_points = query_with_fallback(driver, "points", BING_POINTS_QUERY_JS, parse_bing_points)
+    return total_points or '未找到总积分', today_points or '未找到今日积分'
+
+def query_pc_search_progress(driver):
+    """返回电脑搜索的(当前, 上限)，规则与parse_pc_search_progress相同"""
+    current, total = query_with_fallback(driver, "points_detail", PC_SEARCH_PROGRESS_QUERY_JS,
+                                         parse_pc_search_progress)
+    return current, total
+
+# ========== 业务逻辑 ==========
 def login_bing(driver, email, password, idx, group_name=None):
     # 检查WebDriver连接
     if group_name and not check_driver_connection(driver, group_name):
@@ -416,19 +1928,19 @@ def login_bing(driver, email, password, idx, group_name=None):
     for page_try in range(max_page_retry):
         logger.info(f"第{page_try+1}次尝试登录...")
         driver.get(BING_URL)
-        time.sleep(3)  # 增加等待时间
+        interruptible_sleep(3)  # 增加等待时间
         
         if not click_login_button(driver, idx):
             raise Exception("未找到登录按钮")
         
         # 等待新窗口打开
-        time.sleep(3)
+        interruptible_sleep(3)
         if len(driver.window_handles) > 1:
             driver.switch_to.window(driver.window_handles[-1])
             logger.info("已切换到登录窗口")
         
         # 等待页面加载
-        time.sleep(3)
+        interruptible_sleep(3)
         
         # 尝试多种方式找到邮箱输入框
         email_entered = False
@@ -449,7 +1961,7 @@ def login_bing(driver, email, password, idx, group_name=None):
                     email_entered = True
                     logger.info(f"成功输入邮箱，使用选择器: {selector_type} = {selector_value}")
                     break
-                time.sleep(2)
+                interruptible_sleep(2)
             except Exception as e:
                 logger.warning(f"选择器 {selector_type} = {selector_value} 失败: {e}")
                 continue
@@ -458,8 +1970,9 @@ def login_bing(driver, email, password, idx, group_name=None):
             break  # 成功输入邮箱，跳出大循环
         else:
             logger.warning(f"第{page_try+1}次页面加载未找到邮箱输入框，刷新页面重试...")
+            count_retry("login_page")
             driver.refresh()
-            time.sleep(5)
+            interruptible_sleep(5)
     else:
         logger.error("多次刷新页面后仍未找到邮箱输入框，跳过该账号。")
         raise Exception("未找到邮箱输入框")
@@ -467,11 +1980,12 @@ def login_bing(driver, email, password, idx, group_name=None):
         raise Exception("未找到下一个按钮")
     
     # 处理可能的验证码页面
-    time.sleep(3)
+    interruptible_sleep(3)
     try:
         # 检查是否出现验证码页面
-        page_text = driver.page_source
-        if "获取用于登录的代码" in page_text or "发送验证码" in page_text:
+        page_states = query_page_states(driver, "login_after_email")
+        corpus_recorder.capture(driver, "login_after_email")
+        if "verification_code" in page_states:
             logger.info("检测到验证码页面，尝试点击'使用密码'按钮")
             try:
                 # 尝试多种方式找到"使用密码"按钮
@@ -488,9 +2002,9 @@ def login_bing(driver, email, password, idx, group_name=None):
                 
                 for btn_type, btn_value in password_buttons:
                     try:
-                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=3):
+                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=3, adaptive=False):
                             logger.info(f"成功点击'使用密码'按钮: {btn_type} = {btn_value}")
-                            time.sleep(3)
+                            interruptible_sleep(3)
                             break
                     except Exception:
                         continue
@@ -502,7 +2016,7 @@ def login_bing(driver, email, password, idx, group_name=None):
         logger.warning(f"检查验证码页面失败: {e}")
     
     for _ in range(MAX_SKIP):
-        time.sleep(1)
+        interruptible_sleep(1)
         current_url = driver.current_url
         
         # 检查是否已经到达密码输入页面
@@ -519,7 +2033,7 @@ def login_bing(driver, email, password, idx, group_name=None):
             logger.info("已到达Bing主页，跳出通行密钥处理循环")
             break
         try:
-            skip_btn = WebDriverWait(driver, 2).until(
+            skip_btn = wait_for(driver, 2).until(
                 EC.element_to_be_clickable((By.XPATH, "//*[text()='暂时跳过']"))
             )
             skip_btn.click()
@@ -528,7 +2042,7 @@ def login_bing(driver, email, password, idx, group_name=None):
         except Exception:
             pass
         try:
-            next_btn = WebDriverWait(driver, 2).until(
+            next_btn = wait_for(driver, 2).until(
                 EC.element_to_be_clickable((By.XPATH, "//*[text()='下一个']"))
             )
             next_btn.click()
@@ -539,33 +2053,27 @@ def login_bing(driver, email, password, idx, group_name=None):
         if "setup" in current_url or "create" in current_url:
             logger.warning("检测到setup/create页面，强制跳转到bing主页。")
             driver.get(BING_URL)
-            time.sleep(2)
+            interruptible_sleep(2)
             break
     try:
-        WebDriverWait(driver, WAIT_TIMEOUT).until(
+        wait_for(driver, WAIT_TIMEOUT, "username_hidden").until(
             EC.invisibility_of_element_located((By.ID, "usernameEntry"))
         )
     except Exception:
         pass
-    try:
-        # 增强密码输入框查找逻辑，循环多种方式，延长等待时间
-        password_input = None
-        for _ in range(WAIT_TIMEOUT * 2):  # 最多等30秒
+    def find_password_input(drv):
+        for by, value in ((By.NAME, "passwd"), (By.ID, "passwordEntry")):
             try:
-                password_input = driver.find_element(By.NAME, "passwd")
-                if password_input.is_displayed():
-                    break
+                for element in drv.find_elements(by, value):
+                    if element.is_displayed():
+                        return element
             except Exception:
                 pass
-            try:
-                password_input = driver.find_element(By.ID, "passwordEntry")
-                if password_input.is_displayed():
-                    break
-            except Exception:
-                pass
-            time.sleep(1)
-        if not password_input or not password_input.is_displayed():
-            raise Exception("未找到密码输入框")
+        return False
+
+    try:
+        # 增强密码输入框查找逻辑，循环多种方式，默认最多等待WAIT_TIMEOUT的两倍
+        password_input = wait_for(driver, WAIT_TIMEOUT * 2, "password_input").until(find_password_input)
     except Exception as e:
         logger.error("未找到密码输入框")
         log_password_debug_info(driver, group_name, email)
@@ -597,12 +2105,17 @@ def login_bing(driver, email, password, idx, group_name=None):
     
     # 处理可能的"创建通行密钥"页面
     try:
-        time.sleep(2)
+        interruptible_sleep(2)
         current_url = driver.current_url
-        page_text = driver.page_source
+        page_states = query_page_states(driver, "login_after_password")
+        record_asset_cache(driver, "login")
+        corpus_recorder.capture(driver, "login_after_password")
         
-        # 检查是否在"创建通行密钥"页面
-        if "创建通行密钥" in page_text or ("passkey" in page_text.lower() and "创建" in page_text) or "使用人脸、指纹或PIN" in page_text:
+        # 检查是否在"创建通行密钥"页面，监视脚本已点击时无需再逐个尝试按钮
+        popup_state = read_popup_watcher(driver) or {}
+        if any(c.get("kind") == "passkey" for c in popup_state.get("clicked", [])):
+            logger.info("弹窗监视脚本已在通行密钥页面点击'暂时跳过'")
+        elif "passkey" in page_states:
             logger.info("检测到通行密钥页面，尝试点击'暂时跳过'")
             try:
                 # 尝试多种方式找到"暂时跳过"按钮
@@ -623,7 +2136,7 @@ def login_bing(driver, email, password, idx, group_name=None):
                 for btn_type, btn_value in skip_buttons:
                     try:
                         # 先尝试普通点击
-                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=2):
+                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=2, adaptive=False):
                             logger.info(f"成功点击'暂时跳过'按钮: {btn_type} = {btn_value}")
                             skip_clicked = True
                             break
@@ -644,58 +2157,16 @@ def login_bing(driver, email, password, idx, group_name=None):
                             continue
                 
                 if skip_clicked:
-                    time.sleep(3)
+                    interruptible_sleep(3)
                 else:
                     logger.warning("所有方式都未能点击'暂时跳过'按钮")
                     
             except Exception as e:
                 logger.warning(f"处理通行密钥页面失败: {e}")
         
-        # 检查是否出现"保持登录状态"弹窗
-        if "保持登录状态" in page_text or "Stay signed in" in page_text:
-            logger.info("检测到'保持登录状态'弹窗，尝试点击'是'")
-            try:
-                yes_buttons = [
-                    (By.XPATH, "//*[text()='是']"),
-                    (By.XPATH, "//*[text()='Yes']"),
-                    (By.XPATH, "//button[contains(text(), '是')]"),
-                    (By.XPATH, "//button[contains(text(), 'Yes')]"),
-                    (By.XPATH, "//input[@value='是']"),
-                    (By.XPATH, "//input[@value='Yes']")
-                ]
-                
-                for btn_type, btn_value in yes_buttons:
-                    try:
-                        # 使用更短的超时时间，快速尝试
-                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=2):
-                            logger.info(f"成功点击'是'按钮: {btn_type} = {btn_value}")
-                            break
-                    except Exception:
-                        continue
-            except Exception as e:
-                logger.warning(f"点击'是'按钮失败: {e}")
-        else:
-            # 尝试点击"是"按钮（如果存在）
-            try:
-                yes_buttons = [
-                    (By.XPATH, "//*[text()='是']"),
-                    (By.XPATH, "//*[text()='Yes']"),
-                    (By.XPATH, "//button[contains(text(), '是')]"),
-                    (By.XPATH, "//button[contains(text(), 'Yes')]"),
-                    (By.XPATH, "//input[@value='是']"),
-                    (By.XPATH, "//input[@value='Yes']")
-                ]
-                
-                for btn_type, btn_value in yes_buttons:
-                    try:
-                        # 使用更短的超时时间，快速尝试
-                        if robust_wait_and_click(driver, btn_type, btn_value, timeout=2):
-                            logger.info(f"成功点击'是'按钮: {btn_type} = {btn_value}")
-                            break
-                    except Exception:
-                        continue
-            except Exception as e:
-                logger.warning(f"点击'是'按钮失败: {e}")
+        # 检查是否出现"保持登录状态"弹窗（由页面内监视脚本识别并点击）
+        if handle_stay_signed_in_popup(driver, idx):
+            logger.info("已处理'保持登录状态'弹窗")
         
         # 检查是否已经登录成功
         if "bing.com" in current_url:
@@ -705,24 +2176,25 @@ def login_bing(driver, email, password, idx, group_name=None):
     except Exception as e:
         logger.warning(f"检查登录状态失败: {e}")
     
-    time.sleep(1)
+    interruptible_sleep(1)
 
 def sign_in_rewards(driver, idx, email, group_name=None):
     # 检查WebDriver连接
     if group_name and not check_driver_connection(driver, group_name):
         raise Exception("WebDriver连接已断开")
     
+    started = time.monotonic()
     driver.get(REWARDS_URL)
-    time.sleep(5)
+    interruptible_sleep(5)
     logger.info(f"账号{email}已访问Rewards页面。")
+    record_asset_cache(driver, "rewards")
+    corpus_recorder.capture(driver, "rewards_dashboard", started=started)
     try:
-        sign_btns = driver.find_elements(By.XPATH, "//button[contains(., '签到') or contains(., 'Sign in') or contains(., 'Check-in')]")
-        for btn in sign_btns:
-            if btn.is_displayed() and btn.is_enabled():
-                btn.click()
-                logger.info(f"账号{email}已自动签到。")
-                time.sleep(2)
-                break
+        sign_btns = find_sign_in_buttons(driver)
+        if sign_btns:
+            sign_btns[0]["element"].click()
+            logger.info(f"账号{email}已自动签到。")
+            interruptible_sleep(2)
     except Exception as e:
         logger.warning(f"账号{email}自动签到失败: {e}")
 
@@ -733,41 +2205,32 @@ def click_reward_tasks(driver, idx, email, group_name=None):
     
     logger.info(f"账号{email} 开始自动点击积分任务卡片...")
     driver.get(REWARDS_URL)
-    time.sleep(5)
+    interruptible_sleep(5)
     try:
-        cards = driver.find_elements(By.CSS_SELECTOR, '.c-card-content a')
-        filtered_cards = []
-        for card in cards:
-            try:
-                icon = card.find_element(By.CSS_SELECTOR, '.mee-icon-AddMedium')
-                filtered_cards.append(card)
-            except Exception:
-                continue
+        filtered_cards = find_reward_cards(driver)
         logger.info(f'账号{email} 找到 {len(filtered_cards)} 个可点击的积分任务卡片')
-        for i, card in enumerate(filtered_cards):
+        original_window = driver.current_window_handle
+        known_handles = set(driver.window_handles)
+        for i, card_info in enumerate(filtered_cards):
+            card = card_info["element"]
             try:
-                original_window = driver.current_window_handle
-                before_handles = driver.window_handles
-                
                 # 使用JavaScript点击来避免元素遮挡问题
                 driver.execute_script("arguments[0].click();", card)
-                logger.info(f'账号{email} 已点击第 {i+1} 个任务卡片')
-                time.sleep(10)
+                logger.info(f'账号{email} 已点击第 {i+1} 个任务卡片: {card_info.get("text", "")}')
+                interruptible_sleep(10)
                 
-                after_handles = driver.window_handles
-                if len(after_handles) > len(before_handles):
-                    new_window = [h for h in after_handles if h not in before_handles][0]
-                    driver.switch_to.window(new_window)
-                    driver.close()
-                    driver.switch_to.window(original_window)
+                # 新窗口可能在点击后异步打开，等待结束后每张卡片只查询一次window_handles
+                if close_new_windows(driver, original_window, known_handles):
                     logger.info(f'账号{email} 已关闭新打开的任务窗口')
             except Exception as e:
                 logger.warning(f'账号{email} 点击第 {i+1} 个任务卡片失败: {e}')
                 # 如果JavaScript点击失败，尝试滚动到元素位置再点击
                 try:
                     driver.execute_script("arguments[0].scrollIntoView(true);", card)
-                    time.sleep(1)
+                    interruptible_sleep(1)
                     driver.execute_script("arguments[0].click();", card)
+                    interruptible_sleep(10)
+                    close_new_windows(driver, original_window, known_handles)
                     logger.info(f'账号{email} 通过滚动后成功点击第 {i+1} 个任务卡片')
                 except Exception as e2:
                     logger.warning(f'账号{email} 滚动后点击第 {i+1} 个任务卡片仍然失败: {e2}')
@@ -776,10 +2239,40 @@ def click_reward_tasks(driver, idx, email, group_name=None):
     except Exception as e:
         logger.error(f'账号{email} 自动点击积分任务卡片异常: {e}')
 
-def get_bing_points(driver):
-    driver.get(REWARDS_URL)
-    time.sleep(8)
-    page = driver.page_source
+# ========== 页面解析 ==========
+# 纯函数，输入页面HTML或文本。运行时在页面查询失败时作为后备，离线回放(replay)用它们检查快照
+# 登录流程中间页面的识别规则：任一组关键词全部出现（不区分大小写）即命中，
+# 浏览器内的PAGE_STATE_QUERY_JS使用同一份规则
+PAGE_STATE_MARKERS = {
+    "verification_code": [["获取用于登录的代码"], ["发送验证码"]],
+    "passkey": [["创建通行密钥"], ["passkey", "创建"], ["使用人脸、指纹或PIN"]],
+    "stay_signed_in": [["保持登录状态"], ["Stay signed in"]],
+}
+
+def classify_page_text(text):
+    """识别登录流程中的中间页面，返回命中的状态集合"""
+    text = text.lower()
+    return {
+        state for state, alternatives in PAGE_STATE_MARKERS.items()
+        if any(all(term.lower() in text for term in terms) for terms in alternatives)
+    }
+
+def parse_reward_cards(page):
+    """与REWARD_CARDS_JS相同的筛选规则（离线无法判断可见性），返回卡片链接"""
+    soup = BeautifulSoup(page, "html.parser")
+    return [a.get("href", "") for a in soup.select(".c-card-content a") if a.select_one(".mee-icon-AddMedium")]
+
+def parse_sign_in_buttons(page):
+    """与SIGN_IN_BUTTONS_JS相同的筛选规则，返回按钮文本"""
+    soup = BeautifulSoup(page, "html.parser")
+    keywords = ["签到", "Sign in", "Check-in"]
+    return [
+        btn.get_text(strip=True)[:80] for btn in soup.find_all("button")
+        if any(k in btn.get_text() for k in keywords) and not btn.has_attr("disabled")
+    ]
+
+def parse_bing_points(page):
+    """从Rewards页面解析总积分和今日积分"""
     # 总积分
     match_total = re.search(r'"availablePoints"\s*:\s*(\d+)', page)
     if match_total:
@@ -794,34 +2287,48 @@ def get_bing_points(driver):
         if span and span.get("aria-label") and span.get("aria-label").strip().isdigit():
             today_points = span.get("aria-label").strip()
             break
+    return total_points, today_points
+
+def parse_pc_search_progress(page):
+    """从积分明细弹窗解析电脑搜索进度，未找到时返回(None, None)"""
+    soup = BeautifulSoup(page, "html.parser")
+    # 找到所有文本为“电脑搜索”的<a>
+    for a in soup.find_all("a"):
+        if a.get_text(strip=True) == "电脑搜索":
+            # 找到下一个class包含pointsDetail的<p>
+            p = a.find_parent().find_next("p", class_="pointsDetail")
+            if p:
+                b = p.find("b")
+                if b and b.get_text(strip=True).isdigit():
+                    current = b.get_text(strip=True)
+                    match = re.search(r"/\s*(\d+)", p.get_text())
+                    if match:
+                        return current, match.group(1)
+    return None, None
+
+def get_bing_points(driver):
+    started = time.monotonic()
+    driver.get(REWARDS_URL)
+    interruptible_sleep(8)
+    total_points, today_points = query_bing_points(driver)
+    corpus_recorder.capture(driver, "points", started=started)
     logger.info(f"当前Bing总积分：{total_points}，今日积分：{today_points}")
     return total_points, today_points
 
 def get_pc_search_progress(driver):
+    started = time.monotonic()
     driver.get(REWARDS_URL)
     try:
-        detail_btn = WebDriverWait(driver, 10).until(
+        detail_btn = wait_for(driver, 10, "points_detail").until(
             EC.element_to_be_clickable((By.LINK_TEXT, "积分明细"))
         )
         detail_btn.click()
-        time.sleep(8)  # 等待弹窗内容完全渲染
-        page = driver.page_source
-        soup = BeautifulSoup(page, "html.parser")
-        current, total = None, None
-        # 找到所有文本为“电脑搜索”的<a>
-        for a in soup.find_all("a"):
-            if a.get_text(strip=True) == "电脑搜索":
-                # 找到下一个class包含pointsDetail的<p>
-                p = a.find_parent().find_next("p", class_="pointsDetail")
-                if p:
-                    b = p.find("b")
-                    if b and b.get_text(strip=True).isdigit():
-                        current = b.get_text(strip=True)
-                        match = re.search(r"/\s*(\d+)", p.get_text())
-                        if match:
-                            total = match.group(1)
-                            logger.info(f"电脑搜索进度：{current} / {total}")
-                            return current, total
+        interruptible_sleep(8)  # 等待弹窗内容完全渲染
+        current, total = query_pc_search_progress(driver)
+        corpus_recorder.capture(driver, "points_detail", started=started)
+        if current is not None:
+            logger.info(f"电脑搜索进度：{current} / {total}")
+            return current, total
         logger.warning("未找到电脑搜索进度")
         return None, None
     except Exception as e:
@@ -837,27 +2344,29 @@ def search_for_points(driver, idx, email, search_words, group_name=None):
         try:
             random_delay = random.randint(*SLEEP_BETWEEN_SEARCH)
             logger.info(f"等待 {random_delay} 秒后进行第 {i+1} 次搜索...")
-            time.sleep(random_delay)
+            interruptible_sleep(random_delay)
             if (i + 1) % 5 == 0:
                 logger.info(f"已完成4次搜索，暂停{SLEEP_AFTER_4_SEARCH//60}分钟...")
-                time.sleep(SLEEP_AFTER_4_SEARCH)
+                interruptible_sleep(SLEEP_AFTER_4_SEARCH)
             driver.get(BING_URL)
-            search_box = WebDriverWait(driver, 10).until(
+            search_box = wait_for(driver, 10, "search_box").until(
                 EC.visibility_of_element_located((By.NAME, "q"))
             )
+            if i == 0:
+                record_asset_cache(driver, "search")
             search_box.clear()
             search_box.send_keys(word)
             search_box.submit()
             logger.info(f"账号{email} 搜索：{word}")
             if random.random() < 0.3:
                 try:
-                    first_result = WebDriverWait(driver, 5).until(
+                    first_result = wait_for(driver, 5, "first_result").until(
                         EC.element_to_be_clickable((By.CSS_SELECTOR, "li.b_algo h2 a"))
                     )
                     original_window = driver.current_window_handle
                     before_handles = driver.window_handles
                     first_result.click()
-                    time.sleep(random.uniform(5, 10))
+                    interruptible_sleep(random.uniform(5, 10))
                     after_handles = driver.window_handles
                     if len(after_handles) > len(before_handles):
                         new_window = [h for h in after_handles if h not in before_handles][0]
@@ -874,100 +2383,147 @@ def search_for_points(driver, idx, email, search_words, group_name=None):
         except Exception as e:
             logger.warning(f"账号{email} 搜索 {word} 失败: {e}")
     driver.get(REWARDS_URL)
-    time.sleep(3)
-    get_bing_points(driver)
+    interruptible_sleep(3)
+    points = get_bing_points(driver)
     logger.info(f"账号{email} 搜索任务完成。")
+    return points
 
 def logout_bing(driver):
     try:
         driver.get("https://login.live.com/logout.srf")
-        time.sleep(2)
+        interruptible_sleep(2)
     except Exception:
         pass
 
-def create_chrome_options():
+def chrome_arguments(cache_dir=None):
     """
-    创建Chrome选项
+    Chrome启动参数，各浏览器后端共用；指定cache_dir时使用该磁盘缓存目录代替无痕模式
     """
-    chrome_options = uc.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--incognito')
-    chrome_options.add_argument('--disable-extensions')
-    chrome_options.add_argument('--disable-plugins')
-    chrome_options.add_argument('--disable-images')
-    chrome_options.add_argument('--disable-web-security')
-    chrome_options.add_argument('--allow-running-insecure-content')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    arguments = []
+    arguments.append('--no-sandbox')
+    arguments.append('--disable-dev-shm-usage')
+    if cache_dir:
+        # 无痕模式不使用磁盘缓存；用户目录本就是每次新建的临时目录，Cookie不会跨次保留
+        arguments.append(f'--disk-cache-dir={os.path.abspath(cache_dir)}')
+        arguments.append(f'--disk-cache-size={ASSET_CACHE_MAX_BYTES}')
+    else:
+        arguments.append('--incognito')
+    arguments.append('--disable-extensions')
+    arguments.append('--disable-plugins')
+    arguments.append('--disable-images')
+    arguments.append('--disable-web-security')
+    arguments.append('--allow-running-insecure-content')
+    arguments.append('--disable-blink-features=AutomationControlled')
     
     # 在GitHub Actions环境中添加额外选项
     if os.getenv('GITHUB_ACTIONS'):
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-features=TranslateUI')
-        chrome_options.add_argument('--disable-ipc-flooding-protection')
-        chrome_options.add_argument('--disable-setuid-sandbox')
-        chrome_options.add_argument('--disable-accelerated-2d-canvas')
-        chrome_options.add_argument('--disable-accelerated-jpeg-decoding')
-        chrome_options.add_argument('--disable-accelerated-mjpeg-decode')
-        chrome_options.add_argument('--disable-accelerated-video-decode')
-        chrome_options.add_argument('--disable-gpu-sandbox')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-threaded-animation')
-        chrome_options.add_argument('--disable-threaded-scrolling')
-        chrome_options.add_argument('--disable-checker-imaging')
-        chrome_options.add_argument('--disable-new-tab-first-run')
-        chrome_options.add_argument('--disable-default-apps')
-        chrome_options.add_argument('--disable-sync')
-        chrome_options.add_argument('--disable-translate')
-        chrome_options.add_argument('--disable-web-resources')
-        chrome_options.add_argument('--disable-client-side-phishing-detection')
-        chrome_options.add_argument('--disable-component-update')
-        chrome_options.add_argument('--disable-domain-reliability')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--disable-hang-monitor')
-        chrome_options.add_argument('--disable-prompt-on-repost')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-session-crashed-bubble')
-        chrome_options.add_argument('--disable-single-click-autofill')
-        chrome_options.add_argument('--disable-tab-for-desktop-share')
-        chrome_options.add_argument('--disable-usb-keyboard-detect')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--no-first-run')
-        chrome_options.add_argument('--no-default-browser-check')
-        chrome_options.add_argument('--no-zygote')
-        chrome_options.add_argument('--single-process')
-        chrome_options.add_argument('--disable-background-networking')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-breakpad')
-        chrome_options.add_argument('--disable-component-extensions-with-background-pages')
-        chrome_options.add_argument('--disable-features=TranslateUI,BlinkGenPropertyTrees')
-        chrome_options.add_argument('--disable-ipc-flooding-protection')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-sync-preferences')
-        chrome_options.add_argument('--force-color-profile=srgb')
-        chrome_options.add_argument('--metrics-recording-only')
-        chrome_options.add_argument('--no-report-upload')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
+        arguments.append('--disable-dev-shm-usage')
+        arguments.append('--disable-software-rasterizer')
+        arguments.append('--disable-background-timer-throttling')
+        arguments.append('--disable-backgrounding-occluded-windows')
+        arguments.append('--disable-renderer-backgrounding')
+        arguments.append('--disable-features=TranslateUI')
+        arguments.append('--disable-ipc-flooding-protection')
+        arguments.append('--disable-setuid-sandbox')
+        arguments.append('--disable-accelerated-2d-canvas')
+        arguments.append('--disable-accelerated-jpeg-decoding')
+        arguments.append('--disable-accelerated-mjpeg-decode')
+        arguments.append('--disable-accelerated-video-decode')
+        arguments.append('--disable-gpu-sandbox')
+        arguments.append('--disable-software-rasterizer')
+        arguments.append('--disable-threaded-animation')
+        arguments.append('--disable-threaded-scrolling')
+        arguments.append('--disable-checker-imaging')
+        arguments.append('--disable-new-tab-first-run')
+        arguments.append('--disable-default-apps')
+        arguments.append('--disable-sync')
+        arguments.append('--disable-translate')
+        arguments.append('--disable-web-resources')
+        arguments.append('--disable-client-side-phishing-detection')
+        arguments.append('--disable-component-update')
+        arguments.append('--disable-domain-reliability')
+        arguments.append('--disable-features=VizDisplayCompositor')
+        arguments.append('--disable-hang-monitor')
+        arguments.append('--disable-prompt-on-repost')
+        arguments.append('--disable-renderer-backgrounding')
+        arguments.append('--disable-session-crashed-bubble')
+        arguments.append('--disable-single-click-autofill')
+        arguments.append('--disable-tab-for-desktop-share')
+        arguments.append('--disable-usb-keyboard-detect')
+        arguments.append('--disable-web-security')
+        arguments.append('--no-first-run')
+        arguments.append('--no-default-browser-check')
+        arguments.append('--no-zygote')
+        arguments.append('--single-process')
+        arguments.append('--disable-background-networking')
+        arguments.append('--disable-background-timer-throttling')
+        arguments.append('--disable-backgrounding-occluded-windows')
+        arguments.append('--disable-breakpad')
+        arguments.append('--disable-component-extensions-with-background-pages')
+        arguments.append('--disable-features=TranslateUI,BlinkGenPropertyTrees')
+        arguments.append('--disable-ipc-flooding-protection')
+        arguments.append('--disable-renderer-backgrounding')
+        arguments.append('--disable-sync-preferences')
+        arguments.append('--force-color-profile=srgb')
+        arguments.append('--metrics-recording-only')
+        arguments.append('--no-report-upload')
+        arguments.append('--disable-background-timer-throttling')
+        arguments.append('--disable-backgrounding-occluded-windows')
+        arguments.append('--disable-renderer-backgrounding')
     
     if HEADLESS:
-        chrome_options.add_argument('--headless=new')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--remote-debugging-port=9222')
+        arguments.append('--headless=new')
+        arguments.append('--disable-gpu')
+        arguments.append('--window-size=1920,1080')
+        arguments.append('--remote-debugging-port=9222')
     
+    return arguments
+
+def create_chrome_options(cache_dir=None):
+    """
+    创建Chrome选项
+    """
+    chrome_options = uc.ChromeOptions()
+    for argument in chrome_arguments(cache_dir):
+        chrome_options.add_argument(argument)
     return chrome_options
 
-def process_account_group(group_name, accounts, search_words):
-    """处理一个账号组（一个浏览器处理多个账号）"""
+def prepare_driver(driver):
+    """新建driver后的统一初始化：登记driver、挂载会话健康跟踪并注册弹窗监视脚本"""
+    register_driver(driver)
+    attach_session_health(driver)
+    install_popup_watcher(driver)
+    return driver
+
+def launch_chrome(group_name, chrome_version_main, profile_prefix, port_offset=0, backend=None):
+    """使用独立的临时用户数据目录启动Chrome，返回初始化完成的driver"""
+    import tempfile
+    backend = backend or get_browser_backend()
+    cache_slot = asset_cache.acquire() if asset_cache.enabled else None
+    temp_dir = tempfile.mkdtemp(prefix=profile_prefix)
+    arguments = chrome_arguments(cache_slot) + [f'--user-data-dir={temp_dir}']
+    try:
+        driver = backend.start(arguments, chrome_version_main, 9222 + hash(group_name) % 1000 + port_offset)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if cache_slot:
+            asset_cache.release(cache_slot)
+        raise
+    driver._profile_dir = temp_dir
+    driver._asset_cache_slot = cache_slot
+    return prepare_driver(driver)
+
+def process_account_group(group_name, accounts, search_words, history=None):
+    """处理一个账号组（一个浏览器处理多个账号），每个账号的结果记入history"""
+    set_log_group(group_name)
     logger.info(f"=== 开始处理账号组 {group_name} ===")
     
+    recorded = set()
+    def record(email, status, points=(None, None), error=None):
+        recorded.add(email)
+        if history:
+            history.record_account(group_name, email, status, points, error)
+    
     driver = None
     chrome_version_main = get_chrome_version_main()
     try:
@@ -977,49 +2533,46 @@ def process_account_group(group_name, accounts, search_words):
         # 尝试多种方式启动Chrome
         driver = None
         for attempt in range(3):
+            check_shutdown()
             try:
                 logger.info(f"账号组 {group_name} 第{attempt+1}次尝试启动Chrome...")
+                if attempt:
+                    count_retry("chrome_launch")
                 logger.info("注意: 首次启动可能需要1-2分钟，请耐心等待...")
                 
                 # 使用线程来避免超时问题
-                import threading
-                
                 driver_result = {'driver': None, 'error': None}
                 
                 def create_driver():
+                    set_log_group(group_name)
                     try:
-                        # 为每个group创建新的Chrome选项，避免重用问题
-                        chrome_options = create_chrome_options()
-                        
                         # 为每个group使用不同的用户数据目录，避免冲突
-                        import tempfile
-                        import os
-                        temp_dir = tempfile.mkdtemp(prefix=f"chrome_group_{group_name}_")
-                        chrome_options.add_argument(f'--user-data-dir={temp_dir}')
-                        chrome_options.add_argument(f'--remote-debugging-port={9222 + hash(group_name) % 1000}')
-
-                        if chrome_version_main:
-                            logger.info(f"使用Chrome主版本号 {chrome_version_main} 启动浏览器")
-                            driver_result['driver'] = uc.Chrome(options=chrome_options, version_main=chrome_version_main)
-                        else:
-                            driver_result['driver'] = uc.Chrome(options=chrome_options)
+                        driver_result['driver'] = launch_chrome(
+                            group_name, chrome_version_main, f"chrome_group_{group_name}_"
+                        )
                         logger.info(f"账号组 {group_name} Chrome浏览器启动成功！")
+                        if shutdown_event.is_set():
+                            # 启动期间收到关闭信号，主线程已不再等待
+                            quit_driver(driver_result['driver'])
                     except Exception as e:
                         logger.error(f"账号组 {group_name} ChromeDriver创建失败: {e}")
                         driver_result['error'] = e
                 
                 # 启动线程
-                driver_thread = threading.Thread(target=create_driver)
+                driver_thread = threading.Thread(target=create_driver, name=f"driver-{group_name}")
                 driver_thread.start()
                 
-                # 等待最多90秒
-                driver_thread.join(timeout=90)
+                # 等待最多90秒，期间可被关闭信号打断
+                deadline = time.monotonic() + 90
+                while driver_thread.is_alive() and time.monotonic() < deadline:
+                    driver_thread.join(timeout=1)
+                    check_shutdown()
                 
                 if driver_thread.is_alive():
                     logger.warning(f"账号组 {group_name} 第{attempt+1}次启动超时（90秒），尝试重试...")
                     if attempt < 2:  # 不是最后一次尝试
                         logger.info("等待10秒后重试...")
-                        time.sleep(10)
+                        interruptible_sleep(10)
                     else:
                         raise Exception("Chrome启动超时，请检查网络连接或Chrome安装")
                 else:
@@ -1036,7 +2589,7 @@ def process_account_group(group_name, accounts, search_words):
                 logger.warning(f"账号组 {group_name} 第{attempt+1}次启动失败: {e}")
                 if attempt < 2:  # 不是最后一次尝试
                     logger.info("等待10秒后重试...")
-                    time.sleep(10)
+                    interruptible_sleep(10)
                 else:
                     raise e
         
@@ -1044,118 +2597,1232 @@ def process_account_group(group_name, accounts, search_words):
         for idx, account in enumerate(accounts):
             email = account['email']
             password = account['password']
+            set_log_account(email)
             logger.info(f"\n==== 账号组 {group_name} 开始账号 {email} 的自动化任务 ====")
             
             try:
-                # 检查driver是否还活着
-                try:
-                    driver.current_url
-                except Exception:
+                # 检查driver是否还活着（近期命令成功时不产生额外请求）
+                if not check_driver_connection(driver, group_name):
                     logger.warning(f"账号组 {group_name} WebDriver连接已断开，尝试重新创建...")
-                    try:
-                        driver.quit()
-                    except:
-                        pass
+                    count_driver_restart(group_name, "disconnected")
+                    quit_driver(driver)
                     
                     # 重新创建driver
                     for attempt in range(3):
+                        # 收到关闭信号后不再启动新的Chrome
+                        check_shutdown()
                         try:
                             logger.info(f"账号组 {group_name} 第{attempt+1}次尝试重新启动Chrome...")
-                            # 创建新的Chrome选项对象
-                            new_chrome_options = create_chrome_options()
                             # 为重新创建的driver也使用独立的用户数据目录
-                            import tempfile
-                            temp_dir = tempfile.mkdtemp(prefix=f"chrome_group_{group_name}_retry_{attempt}_")
-                            new_chrome_options.add_argument(f'--user-data-dir={temp_dir}')
-                            new_chrome_options.add_argument(f'--remote-debugging-port={9222 + hash(group_name) % 1000 + attempt}')
-
-                            if chrome_version_main:
-                                logger.info(f"使用Chrome主版本号 {chrome_version_main} 重新启动浏览器")
-                                driver = uc.Chrome(options=new_chrome_options, version_main=chrome_version_main)
-                            else:
-                                driver = uc.Chrome(options=new_chrome_options)
+                            driver = launch_chrome(
+                                group_name, chrome_version_main,
+                                f"chrome_group_{group_name}_retry_{attempt}_", port_offset=attempt
+                            )
                             logger.info(f"账号组 {group_name} Chrome浏览器重新启动成功！")
                             break
                         except Exception as e:
                             logger.warning(f"账号组 {group_name} 第{attempt+1}次重新启动失败: {e}")
                             if attempt < 2:
-                                time.sleep(10)
+                                interruptible_sleep(10)
                             else:
                                 raise Exception(f"无法重新启动Chrome: {e}")
                 
                 logger.info(f"开始登录账号 {email}...")
-                login_bing(driver, email, password, idx, group_name)
+                with measure_phase("login"):
+                    login_bing(driver, email, password, idx, group_name)
                 
                 logger.info(f"开始签到奖励...")
-                sign_in_rewards(driver, idx, email, group_name)
+                with measure_phase("sign_in"):
+                    sign_in_rewards(driver, idx, email, group_name)
                 
                 logger.info(f"开始点击积分任务...")
-                click_reward_tasks(driver, idx, email, group_name)
+                with measure_phase("reward_tasks"):
+                    click_reward_tasks(driver, idx, email, group_name)
                 
                 logger.info(f"开始搜索赚积分...")
-                search_for_points(driver, idx, email, search_words, group_name)
+                with measure_phase("search"):
+                    points = search_for_points(driver, idx, email, search_words, group_name)
                 
                 logger.info(f"==== 账号组 {group_name} 账号 {email} 任务完成 ====")
+                record_chrome_memory(driver, group_name)
+                record(email, "ok", points)
                 
             except Exception as e:
                 logger.error(f"账号组 {group_name} 账号{email} 自动化流程异常: {e}")
+                record(email, "failed", error=str(e))
                 import traceback
                 logger.error(f"详细错误信息: {traceback.format_exc()}")
                 
                 # 如果是WebDriver连接问题，尝试重新创建driver
-                if "Failed to establish a new connection" in str(e) or "HTTPConnectionPool" in str(e) or "invalid session id" in str(e):
+                if is_connection_error(e):
                     logger.warning(f"检测到WebDriver连接问题，尝试重新创建driver...")
-                    try:
-                        driver.quit()
-                    except:
-                        pass
+                    count_driver_restart(group_name, "connection_error")
+                    quit_driver(driver)
                     driver = None
                     
                     # 重新创建driver
                     for attempt in range(3):
+                        # 收到关闭信号后不再启动新的Chrome
+                        check_shutdown()
                         try:
                             logger.info(f"账号组 {group_name} 第{attempt+1}次尝试重新启动Chrome...")
-                            # 创建新的Chrome选项对象
-                            new_chrome_options = create_chrome_options()
                             # 为重新创建的driver也使用独立的用户数据目录
-                            import tempfile
-                            temp_dir = tempfile.mkdtemp(prefix=f"chrome_group_{group_name}_retry_{attempt}_")
-                            new_chrome_options.add_argument(f'--user-data-dir={temp_dir}')
-                            new_chrome_options.add_argument(f'--remote-debugging-port={9222 + hash(group_name) % 1000 + attempt}')
-                            
-                            if chrome_version_main:
-                                logger.info(f"使用Chrome主版本号 {chrome_version_main} 重新启动浏览器")
-                                driver = uc.Chrome(options=new_chrome_options, version_main=chrome_version_main)
-                            else:
-                                driver = uc.Chrome(options=new_chrome_options)
+                            driver = launch_chrome(
+                                group_name, chrome_version_main,
+                                f"chrome_group_{group_name}_retry_{attempt}_", port_offset=attempt
+                            )
                             logger.info(f"账号组 {group_name} Chrome浏览器重新启动成功！")
                             break
                         except Exception as e2:
                             logger.warning(f"账号组 {group_name} 第{attempt+1}次重新启动失败: {e2}")
                             if attempt < 2:
-                                time.sleep(10)
+                                interruptible_sleep(10)
                             else:
                                 logger.error(f"无法重新启动Chrome，跳过剩余账号")
                                 return  # 退出整个账号组处理
                 
                 continue  # 继续处理下一个账号
             
+    except ShutdownRequested:
+        logger.warning(f"账号组 {group_name} 收到关闭信号，停止处理")
     except Exception as e:
         logger.error(f"账号组 {group_name} 整体异常: {e}")
         import traceback
         logger.error(f"详细错误信息: {traceback.format_exc()}")
     finally:
+        reason = "收到关闭信号" if shutdown_event.is_set() else "账号组提前结束"
+        for account in accounts:
+            if account['email'] not in recorded:
+                record(account['email'], "cancelled" if shutdown_event.is_set() else "skipped", error=reason)
         if driver:
-            try:
-                logger.info(f"正在关闭账号组 {group_name} 的浏览器...")
-                logout_bing(driver)
-                driver.quit()
-                logger.info(f"账号组 {group_name} 浏览器已成功关闭")
-            except Exception as e:
-                logger.warning(f"关闭账号组 {group_name} 浏览器时出错: {e}")
+            record_chrome_memory(driver, group_name)
+            health = getattr(driver, "_session_health", None)
+            if health:
+                logger.info(f"账号组 {group_name} 会话健康检查: 实际探测 {health.probes} 次，省去 {health.skipped_probes} 次")
+            logger.info(f"正在关闭账号组 {group_name} 的浏览器...")
+            if not shutdown_event.is_set():
+                try:
+                    with measure_phase("logout"):
+                        logout_bing(driver)
+                except ShutdownRequested:
+                    pass
+            quit_driver(driver)
+            logger.info(f"账号组 {group_name} 浏览器已关闭")
         logger.info(f"=== 账号组 {group_name} 任务结束 ===")
 
-def main():
+# ========== 浏览器后端 ==========
+# 业务函数只使用WebDriver接口的一个子集（get、execute_script、find_element(s)、窗口/frame切换、截图等），
+# 每个后端返回实现该子集的driver对象；等待和异常沿用selenium的WebDriverWait和异常类型
+CHROME_BINARY_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+                       "chrome-headless-shell")
+
+class SeleniumBackend:
+    """undetected_chromedriver：Python → chromedriver HTTP → Chrome"""
+
+    name = "selenium"
+
+    def start(self, arguments, chrome_version_main, debug_port):
+        chrome_options = uc.ChromeOptions()
+        for argument in arguments:
+            chrome_options.add_argument(argument)
+        chrome_options.add_argument(f'--remote-debugging-port={debug_port}')
+        if chrome_version_main:
+            logger.info(f"使用Chrome主版本号 {chrome_version_main} 启动浏览器")
+            return uc.Chrome(options=chrome_options, version_main=chrome_version_main)
+        return uc.Chrome(options=chrome_options)
+
+def find_chrome_binary():
+    binary = CHROME_BINARY or next(filter(None, map(shutil.which, CHROME_BINARY_NAMES)), None)
+    if not binary:
+        raise Exception("未找到Chrome，请通过CHROME_BINARY指定Chrome或chrome-headless-shell路径")
+    return binary
+
+class CdpBackend:
+    """自行启动Chrome并直接通过DevTools websocket控制，不经过chromedriver，支持chrome-headless-shell"""
+
+    name = "cdp"
+
+    def start(self, arguments, chrome_version_main, debug_port):
+        binary = find_chrome_binary()
+        headless_shell = "headless-shell" in os.path.basename(binary)
+        arguments = [
+            argument for argument in arguments
+            if not argument.startswith("--remote-debugging-port")
+            and not (headless_shell and argument.startswith("--headless"))
+        ]
+        # 端口由Chrome自选并写入用户目录下的DevToolsActivePort，避免多个组争用端口
+        arguments.append("--remote-debugging-port=0")
+        profile_dir = next(a.split("=", 1)[1] for a in arguments if a.startswith("--user-data-dir="))
+        process = subprocess.Popen([binary, *arguments, "about:blank"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ws_url = self._wait_for_endpoint(process, profile_dir)
+            return CdpDriver(process, ws_url, headless=HEADLESS or headless_shell)
+        except BaseException:
+            kill_process_tree(process.pid)
+            process.wait(timeout=10)
+            raise
+
+    @staticmethod
+    def _wait_for_endpoint(process, profile_dir, timeout=60):
+        path = os.path.join(profile_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise Exception(f"Chrome启动后立即退出，退出码 {process.returncode}")
+            try:
+                with open(path, "r") as f:
+                    port, ws_path = f.read().split()[:2]
+                return f"ws://127.0.0.1:{port}{ws_path}"
+            except (OSError, ValueError):
+                interruptible_sleep(0.05)
+        raise Exception("等待Chrome DevTools端口超时")
+
+BROWSER_BACKENDS = {
+    "selenium": SeleniumBackend,
+    "cdp": CdpBackend,
+}
+
+def get_browser_backend(name=None):
+    """按名称返回后端，默认取环境变量BROWSER_BACKEND，以便隔离模式的子进程使用同一后端"""
+    name = name or os.getenv("BROWSER_BACKEND", BROWSER_BACKEND)
+    if name not in BROWSER_BACKENDS:
+        raise ValueError(f"未知的浏览器后端: {name}")
+    return BROWSER_BACKENDS[name]()
+
+# 在页面内执行用户脚本，把返回值中的DOM节点换成编号，节点本身留在页面中另行取回
+SCRIPT_RUNNER_JS = """function(fn, args) {
+    var nodes = [];
+    function encode(value) {
+        if (value && typeof value === 'object' && value.nodeType && typeof value.nodeName === 'string') {
+            nodes.push(value);
+            return {__cdp_node__: nodes.length - 1};
+        }
+        if (Array.isArray(value) || (value && typeof value === 'object' && typeof value.length === 'number'
+                                     && typeof value.item === 'function')) {
+            return Array.prototype.map.call(value, encode);
+        }
+        if (value && typeof value === 'object') {
+            var result = {};
+            Object.keys(value).forEach(function(key) { result[key] = encode(value[key]); });
+            return result;
+        }
+        return value === undefined ? null : value;
+    }
+    var value = encode(fn.apply(null, args));
+    window.__cdpNodes = nodes;
+    return {value: value, nodes: nodes.length};
+}"""
+
+FIND_ELEMENTS_JS = """
+var by = arguments[0], value = arguments[1], root = arguments[2] || document;
+if (by === 'xpath') {
+    var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var found = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) { found.push(snapshot.snapshotItem(i)); }
+    return found;
+}
+if (by === 'link text' || by === 'partial link text') {
+    return Array.prototype.filter.call(root.querySelectorAll('a'), function(a) {
+        var text = (a.innerText || a.textContent).trim();
+        return by === 'link text' ? text === value : text.indexOf(value) >= 0;
+    });
+}
+return Array.prototype.slice.call(root.querySelectorAll(value));
+"""
+
+CLICK_POINT_JS = """
+var el = arguments[0];
+el.scrollIntoView({block: 'center', inline: 'center'});
+var rect = el.getBoundingClientRect();
+if (!rect.width || !rect.height) { return {error: 'not_interactable'}; }
+var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+var hit = document.elementFromPoint(x, y);
+if (hit && hit !== el && !el.contains(hit)) { return {error: 'intercepted', by: hit.outerHTML.slice(0, 120)}; }
+return {x: x, y: y};
+"""
+
+ELEMENT_STATE_JS = """
+var el = arguments[0];
+switch (arguments[1]) {
+    case 'displayed':
+        var style = getComputedStyle(el);
+        return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    case 'enabled': return !el.disabled;
+    case 'text': return (el.innerText || '').trim();
+    case 'tag': return el.tagName.toLowerCase();
+    case 'attribute':
+        var name = arguments[2];
+        var prop = el[name];
+        if (prop !== undefined && prop !== null && typeof prop !== 'object' && typeof prop !== 'function') {
+            return typeof prop === 'boolean' ? (prop ? 'true' : null) : String(prop);
+        }
+        return el.getAttribute(name);
+    case 'clear':
+        el.value = '';
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        return null;
+    case 'focus': el.focus(); return null;
+    case 'submit':
+        var form = el.form || el.closest('form');
+        if (form) { form.requestSubmit ? form.requestSubmit() : form.submit(); }
+        return null;
+    case 'frame_offset':
+        var rect = el.getBoundingClientRect();
+        return [rect.left + el.clientLeft, rect.top + el.clientTop];
+}
+"""
+
+# send_keys中需要按键事件而不是文本插入的selenium Keys字符
+CDP_SPECIAL_KEYS = {
+    "\ue007": ("Enter", 13, "\r"),  # Keys.ENTER
+    "\ue006": ("Enter", 13, "\r"),  # Keys.RETURN
+    "\ue004": ("Tab", 9, ""),  # Keys.TAB
+}
+
+def locator_to_query(by, value):
+    """与selenium相同，把id/name/class name/tag name转换为CSS选择器"""
+    if by == "id":
+        return "css selector", f'[id="{value}"]'
+    if by == "name":
+        return "css selector", f'[name="{value}"]'
+    if by == "class name":
+        return "css selector", f".{value}"
+    if by == "tag name":
+        return "css selector", value
+    return by, value
+
+class CdpElement:
+    """页面中的一个DOM节点，对应Runtime远程对象"""
+
+    def __init__(self, driver, object_id):
+        self.driver = driver
+        self.object_id = object_id
+
+    def _state(self, name, *args):
+        return self.driver.execute_script(ELEMENT_STATE_JS, self, name, *args)
+
+    def click(self):
+        from selenium.common.exceptions import ElementClickInterceptedException, ElementNotInteractableException
+        point = self.driver.execute_script(CLICK_POINT_JS, self)
+        if point.get("error") == "not_interactable":
+            raise ElementNotInteractableException("element not interactable")
+        if point.get("error") == "intercepted":
+            raise ElementClickInterceptedException(f"element click intercepted, other element would receive the click: {point['by']}")
+        x = point["x"] + self.driver.frame_offset[0]
+        y = point["y"] + self.driver.frame_offset[1]
+        self.driver.execute("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": x, "y": y})
+        for event in ("mousePressed", "mouseReleased"):
+            self.driver.execute("Input.dispatchMouseEvent",
+                                {"type": event, "x": x, "y": y, "button": "left", "clickCount": 1})
+
+    def send_keys(self, *values):
+        self._state("focus")
+        text = "".join(str(value) for value in values)
+        buffer = ""
+        for char in text:
+            if char not in CDP_SPECIAL_KEYS:
+                buffer += char
+                continue
+            if buffer:
+                self.driver.execute("Input.insertText", {"text": buffer})
+                buffer = ""
+            key, code, key_text = CDP_SPECIAL_KEYS[char]
+            for event in ("keyDown", "keyUp"):
+                params = {"type": event, "key": key, "code": key, "windowsVirtualKeyCode": code}
+                if event == "keyDown" and key_text:
+                    params["text"] = key_text
+                self.driver.execute("Input.dispatchKeyEvent", params)
+        if buffer:
+            self.driver.execute("Input.insertText", {"text": buffer})
+
+    def clear(self):
+        self._state("clear")
+
+    def submit(self):
+        self._state("submit")
+
+    def get_attribute(self, name):
+        return self._state("attribute", name)
+
+    def is_displayed(self):
+        return bool(self._state("displayed"))
+
+    def is_enabled(self):
+        return bool(self._state("enabled"))
+
+    @property
+    def text(self):
+        return self._state("text")
+
+    @property
+    def tag_name(self):
+        return self._state("tag")
+
+    def find_elements(self, by="id", value=None):
+        by, value = locator_to_query(by, value)
+        return self.driver.execute_script(FIND_ELEMENTS_JS, by, value, self)
+
+    def find_element(self, by="id", value=None):
+        return self.driver._first(self.find_elements(by, value), by, value)
+
+class CdpSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        from selenium.common.exceptions import NoSuchWindowException
+        if handle not in self.driver.window_handles:
+            raise NoSuchWindowException(f"no such window: {handle}")
+        self.driver.current_handle = handle
+        self.default_content()
+
+    def frame(self, frame):
+        """切换到iframe元素内；跨域iframe在独立进程中渲染，无法从当前页面进入"""
+        from selenium.common.exceptions import NoSuchFrameException
+        if not isinstance(frame, CdpElement):
+            raise NoSuchFrameException("CDP后端只支持按iframe元素切换")
+        offset = frame._state("frame_offset")
+        node = self.driver.execute("DOM.describeNode", {"objectId": frame.object_id})["node"]
+        if not node.get("frameId"):
+            raise NoSuchFrameException("no such frame")
+        try:
+            context = self.driver.execute("Page.createIsolatedWorld", {
+                "frameId": node["frameId"], "worldName": "cdp_driver", "grantUniveralAccess": True,
+            })["executionContextId"]
+        except Exception as e:
+            raise NoSuchFrameException(f"no such frame: {e}")
+        self.driver.frame_context = context
+        base_x, base_y = self.driver.frame_offset
+        self.driver.frame_offset = (base_x + offset[0], base_y + offset[1])
+
+    def default_content(self):
+        self.driver.frame_context = None
+        self.driver.frame_offset = (0, 0)
+
+class CdpDriver:
+    """
+    直接通过DevTools协议控制Chrome的driver。所有页面级命令经过execute，
+    因此会话健康跟踪和selenium后端一样挂在execute上
+    """
+
+    def __init__(self, process, ws_url, headless=True):
+        from websockets.sync.client import connect
+        self.process = process
+        self.browser_pid = process.pid
+        self.headless = headless
+        self.connection = connect(ws_url, max_size=None, open_timeout=30)
+        self.lock = threading.Lock()
+        self.message_ids = itertools.count(1)
+        self.pending = {}
+        self.closed = False
+        self.load_condition = threading.Condition()
+        self.load_events = {}
+        self.sessions = {}
+        self.handles = []
+        self.current_handle = None
+        self.frame_context = None
+        self.frame_offset = (0, 0)
+        self.page_load_timeout = 120
+        self.switch_to = CdpSwitchTo(self)
+        self.reader = threading.Thread(target=self._read, name="cdp-reader", daemon=True)
+        self.reader.start()
+        self.current_handle = self.window_handles[0]
+
+    # ---- 协议 ----
+    def _read(self):
+        try:
+            for raw in self.connection:
+                message = json.loads(raw)
+                if "id" in message:
+                    with self.lock:
+                        waiter = self.pending.pop(message["id"], None)
+                    if waiter:
+                        waiter["response"] = message
+                        waiter["event"].set()
+                elif message.get("method") in ("Page.loadEventFired", "Page.navigatedWithinDocument"):
+                    with self.load_condition:
+                        key = (message.get("sessionId"), message["method"])
+                        self.load_events[key] = self.load_events.get(key, 0) + 1
+                        self.load_condition.notify_all()
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                waiters = list(self.pending.values())
+                self.pending.clear()
+            for waiter in waiters:
+                waiter["event"].set()
+
+    def _send(self, method, params=None, session_id=None, timeout=120):
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        waiter = {"event": threading.Event()}
+        message = {"id": next(self.message_ids), "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        with self.lock:
+            if self.closed:
+                raise WebDriverException("DevTools连接已断开")
+            self.pending[message["id"]] = waiter
+        try:
+            self.connection.send(json.dumps(message))
+        except Exception as e:
+            raise WebDriverException(f"DevTools连接已断开: {e}")
+        if not waiter["event"].wait(timeout):
+            with self.lock:
+                self.pending.pop(message["id"], None)
+            raise TimeoutException(f"DevTools命令超时: {method}")
+        response = waiter.get("response")
+        if response is None:
+            raise WebDriverException("DevTools连接已断开")
+        if "error" in response:
+            raise WebDriverException(f"{method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def _session(self):
+        session_id = self.sessions.get(self.current_handle)
+        if session_id is None:
+            session_id = self._send("Target.attachToTarget",
+                                    {"targetId": self.current_handle, "flatten": True})["sessionId"]
+            self.sessions[self.current_handle] = session_id
+            self._send("Page.enable", session_id=session_id)
+            if self.headless:
+                # 与undetected_chromedriver一样去掉无头模式UA中的HeadlessChrome标记
+                user_agent = self._send("Browser.getVersion")["userAgent"].replace("HeadlessChrome", "Chrome")
+                self._send("Network.setUserAgentOverride", {"userAgent": user_agent}, session_id)
+        return session_id
+
+    def execute(self, method, params=None):
+        """在当前窗口执行一条DevTools命令"""
+        return self._send(method, params, self._session())
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.execute(cmd, cmd_args)
+
+    # ---- 脚本 ----
+    def execute_script(self, script, *args):
+        from selenium.common.exceptions import JavascriptException
+        function = f"function() {{\n{script}\n}}"
+        element_args = [arg for arg in args if isinstance(arg, CdpElement)]
+        if element_args:
+            declaration = f"function() {{ return ({SCRIPT_RUNNER_JS})({function}, Array.prototype.slice.call(arguments)); }}"
+            response = self.execute("Runtime.callFunctionOn", {
+                "functionDeclaration": declaration,
+                "objectId": element_args[0].object_id,
+                "arguments": [{"objectId": arg.object_id} if isinstance(arg, CdpElement) else {"value": arg}
+                              for arg in args],
+                "returnByValue": True,
+                "awaitPromise": True,
+            })
+        else:
+            response = self._evaluate(f"({SCRIPT_RUNNER_JS})({function}, {json.dumps(list(args))})")
+        if "exceptionDetails" in response:
+            details = response["exceptionDetails"]
+            message = details.get("exception", {}).get("description") or details.get("text")
+            raise JavascriptException(f"javascript error: {message}")
+        result = response["result"].get("value") or {}
+        nodes = self._fetch_nodes() if result.get("nodes") else []
+        return self._decode(result.get("value"), nodes)
+
+    def _evaluate(self, expression, return_by_value=True, main_world=False):
+        params = {"expression": expression, "returnByValue": return_by_value, "awaitPromise": True}
+        if self.frame_context and not main_world:
+            params["contextId"] = self.frame_context
+        return self.execute("Runtime.evaluate", params)
+
+    def _fetch_nodes(self):
+        holder = self._evaluate("window.__cdpNodes", return_by_value=False)["result"]["objectId"]
+        properties = self.execute("Runtime.getProperties", {"objectId": holder, "ownProperties": True})["result"]
+        nodes = {int(p["name"]): CdpElement(self, p["value"]["objectId"])
+                 for p in properties if p["name"].isdigit() and "objectId" in p.get("value", {})}
+        return [nodes[i] for i in range(len(nodes))]
+
+    def _decode(self, value, nodes):
+        if isinstance(value, list):
+            return [self._decode(item, nodes) for item in value]
+        if isinstance(value, dict):
+            if set(value) == {"__cdp_node__"}:
+                return nodes[value["__cdp_node__"]]
+            return {key: self._decode(item, nodes) for key, item in value.items()}
+        return value
+
+    # ---- 元素 ----
+    def _first(self, elements, by, value):
+        from selenium.common.exceptions import NoSuchElementException
+        if not elements:
+            raise NoSuchElementException(f"no such element: Unable to locate element: {by}={value}")
+        return elements[0]
+
+    def find_elements(self, by="id", value=None):
+        by, value = locator_to_query(by, value)
+        return self.execute_script(FIND_ELEMENTS_JS, by, value)
+
+    def find_element(self, by="id", value=None):
+        return self._first(self.find_elements(by, value), by, value)
+
+    # ---- 导航 ----
+    def _navigate(self, action, wait_load=None):
+        """执行导航命令并等待load事件；同文档内跳转（无loaderId）只等待地址提交"""
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        session_id = self._session()
+        with self.load_condition:
+            before = {event: self.load_events.get((session_id, event), 0)
+                      for event in ("Page.loadEventFired", "Page.navigatedWithinDocument")}
+        result = action()
+        self.switch_to.default_content()
+        if result.get("errorText"):
+            raise WebDriverException(f"unknown error: {result['errorText']}")
+        if wait_load is None:
+            wait_load = "loaderId" in result
+        key = (session_id, "Page.loadEventFired" if wait_load else "Page.navigatedWithinDocument")
+        # 同文档跳转的事件可能不来（例如地址未变），只短暂等待
+        deadline = time.monotonic() + (self.page_load_timeout if wait_load else 2)
+        with self.load_condition:
+            while self.load_events.get(key, 0) == before[key[1]]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if not wait_load:
+                        return
+                    raise TimeoutException("timeout: 页面加载超时")
+                self.load_condition.wait(min(remaining, 1))
+                check_shutdown()
+
+    def get(self, url):
+        self._navigate(lambda: self.execute("Page.navigate", {"url": url}))
+
+    def refresh(self):
+        # Page.reload不返回loaderId，但总会触发新的load事件
+        self._navigate(lambda: self.execute("Page.reload"), wait_load=True)
+
+    def back(self):
+        history = self.execute("Page.getNavigationHistory")
+        index = history["currentIndex"]
+        if index <= 0:
+            return
+        entry = history["entries"][index - 1]
+        self.execute("Page.navigateToHistoryEntry", {"entryId": entry["id"]})
+        self.switch_to.default_content()
+        # 从往返缓存恢复时不会触发load事件，改为等待地址和readyState
+        deadline = time.monotonic() + self.page_load_timeout
+        while time.monotonic() < deadline:
+            state = self._evaluate("[location.href, document.readyState]", main_world=True)["result"].get("value")
+            if state and state[0] == entry["url"] and state[1] == "complete":
+                return
+            interruptible_sleep(0.05)
+
+    @property
+    def current_url(self):
+        return self._evaluate("location.href", main_world=True)["result"]["value"]
+
+    @property
+    def title(self):
+        return self._evaluate("document.title", main_world=True)["result"]["value"]
+
+    @property
+    def page_source(self):
+        return self._evaluate("document.documentElement.outerHTML")["result"]["value"]
+
+    # ---- 窗口 ----
+    @property
+    def window_handles(self):
+        """按首次出现的顺序返回页面窗口，与chromedriver一样新窗口在最后"""
+        infos = self._send("Target.getTargets")["targetInfos"]
+        ids = [info["targetId"] for info in infos if info["type"] == "page"]
+        self.handles = [h for h in self.handles if h in ids] + [i for i in ids if i not in self.handles]
+        return list(self.handles)
+
+    @property
+    def current_window_handle(self):
+        return self.current_handle
+
+    def close(self):
+        self._send("Target.closeTarget", {"targetId": self.current_handle})
+        self.sessions.pop(self.current_handle, None)
+
+    def get_screenshot_as_png(self):
+        import base64
+        return base64.b64decode(self.execute("Page.captureScreenshot", {"format": "png"})["data"])
+
+    def save_screenshot(self, filename):
+        with open(filename, "wb") as f:
+            f.write(self.get_screenshot_as_png())
+        return True
+
+    def quit(self):
+        try:
+            self._send("Browser.close", timeout=10)
+        except Exception:
+            pass
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(self.process.pid)
+            self.process.wait(timeout=10)
+
+# ========== 进程隔离 ==========
+def process_rss_mb(pid="self"):
+    """进程的常驻内存(MB)，无法读取时返回0"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return 0.0
+
+def process_pss_mb(pid):
+    """进程按比例分摊共享页后的内存(MB)，多进程浏览器求和时不会重复计算共享内存；无法读取时退回RSS"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return process_rss_mb(pid)
+
+def current_rss_mb():
+    """当前进程的常驻内存(MB)"""
+    rss = process_rss_mb()
+    if rss:
+        return rss
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+def process_tree_pids(root_pid):
+    """返回root_pid及其所有子孙进程（依赖/proc，其他平台只返回root_pid）"""
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return [root_pid]
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+def process_tree_memory_mb(root_pid):
+    """进程树按PSS求和的内存(MB)，Chrome各进程共享的页面只计一次"""
+    return sum(process_pss_mb(pid) for pid in process_tree_pids(root_pid))
+
+def kill_process_tree(root_pid):
+    """强制结束子进程及其启动的chromedriver/Chrome"""
+    for pid in reversed(process_tree_pids(root_pid)):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(root_pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+def driver_cache_dir(group_name):
+    """每个账号组独立的undetected_chromedriver补丁缓存目录，避免多进程同时修补同一文件"""
+    import tempfile
+    safe_name = re.sub(r"[^\w.-]", "_", str(group_name))
+    return os.path.join(tempfile.gettempdir(), f"uc_driver_{safe_name}")
+
+class PipeHistory:
+    """子进程内代替RunHistory，把每个账号的结果通过管道发回父进程"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def record_account(self, group_name, email, status, points=(None, None), error=None):
+        self.conn.send({"type": "account", "group": group_name, "email": email,
+                        "status": status, "points": points, "error": error})
+
+class ProcessLogForwarder:
+    """把各子进程通过multiprocessing队列发来的日志转入本进程的日志管道"""
+
+    def __init__(self):
+        self.queue = multiprocessing.get_context("spawn").Queue()
+        self.thread = threading.Thread(target=self._run, name="log-forwarder", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            logging.getLogger(record.name).handle(record)
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+        self.queue.close()
+        self.queue.join_thread()
+
+def _group_process_entry(conn, log_queue, group_name, accounts, search_words):
+    """子进程入口：使用独立的日志配置和driver缓存处理一个账号组"""
+    if hasattr(os, "setsid"):
+        # 独立进程组，超限时可连同Chrome一起结束
+        os.setsid()
+    install_shutdown_handlers()
+    shutdown_logging()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(GroupContextFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    if get_browser_backend().name == "selenium":
+        uc.Patcher.data_path = driver_cache_dir(group_name)
+    try:
+        process_account_group(group_name, accounts, search_words, PipeHistory(conn))
+    finally:
+        artifact_store.flush()
+        corpus_recorder.flush()
+        timeout_manager.save()
+        conn.send({"type": "metrics", "data": metrics.export()})
+        conn.send({"type": "done"})
+        conn.close()
+
+def run_group_in_process(group_name, accounts, search_words, history, log_queue):
+    """
+    在子进程中运行process_account_group并监管它：
+    结果经管道返回，超过GROUP_TIMEOUT_SECONDS或GROUP_MAX_MEMORY_MB时结束整个进程树
+    """
+    set_log_group(group_name)
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_group_process_entry,
+        args=(child_conn, log_queue, group_name, accounts, search_words),
+        name=f"group-{group_name}",
+    )
+    proc.start()
+    child_conn.close()
+    logger.info(f"账号组 {group_name} 子进程已启动，PID {proc.pid}")
+
+    started = time.monotonic()
+    recorded = set()
+    kill_reason = None
+    terminate_sent = None
+    while True:
+        if shutdown_event.is_set() and terminate_sent is None:
+            # 通知子进程自行清理，宽限期后仍未退出再强制结束
+            terminate_sent = time.monotonic()
+            try:
+                os.kill(proc.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        if parent_conn.poll(1):
+            try:
+                message = parent_conn.recv()
+            except EOFError:
+                break
+            if message["type"] == "account":
+                recorded.add(message["email"])
+                if history:
+                    history.record_account(message["group"], message["email"], message["status"],
+                                           message["points"], message["error"])
+            elif message["type"] == "metrics":
+                metrics.merge(message["data"])
+        elif not proc.is_alive():
+            break
+        # 持续有消息时也要检查时限和内存，避免刷日志的子进程逃过监管
+        elapsed = time.monotonic() - started
+        memory = process_tree_memory_mb(proc.pid)
+        if terminate_sent and time.monotonic() - terminate_sent > SHUTDOWN_GRACE_SECONDS:
+            kill_reason = "关闭宽限期内未退出"
+        elif elapsed > GROUP_TIMEOUT_SECONDS:
+            kill_reason = f"运行超时（{elapsed:.0f}秒）"
+        elif memory > GROUP_MAX_MEMORY_MB:
+            kill_reason = f"内存超限（{memory:.0f}MB）"
+        if kill_reason:
+            logger.error(f"账号组 {group_name} 子进程{kill_reason}，强制结束")
+            metrics.inc("group_process_kills_total", "被强制结束的账号组子进程数", group=group_name)
+            kill_process_tree(proc.pid)
+            break
+
+    proc.join(timeout=10)
+    if proc.is_alive():
+        # 管道已关闭但进程卡在退出清理中（例如浏览器无法关闭）
+        kill_reason = kill_reason or "结果返回后未退出"
+        logger.error(f"账号组 {group_name} 子进程{kill_reason}，强制结束")
+        metrics.inc("group_process_kills_total", "被强制结束的账号组子进程数", group=group_name)
+        kill_process_tree(proc.pid)
+        proc.join(timeout=10)
+    if kill_reason is None and proc.exitcode not in (0, None):
+        kill_reason = f"子进程异常退出（退出码 {proc.exitcode}）"
+        logger.error(f"账号组 {group_name} {kill_reason}")
+    parent_conn.close()
+    for account in accounts:
+        if account['email'] not in recorded and history:
+            status = "cancelled" if shutdown_event.is_set() else "killed"
+            history.record_account(group_name, account['email'], status, error=kill_reason or "子进程未返回结果")
+    logger.info(f"账号组 {group_name} 子进程已结束，用时 {time.monotonic() - started:.0f} 秒")
+
+# ========== 页面快照 ==========
+NAVIGATION_TIMING_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+if (!nav) { return null; }
+return {
+    dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd),
+    load_ms: Math.round(nav.loadEventEnd),
+    transfer_bytes: nav.transferSize || 0
+};
+"""
+
+SENSITIVE_INPUT_TYPES = ("hidden", "password", "email", "text", "tel")
+SANITIZE_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "user@example.com"),
+    (re.compile(r'("(?:name|firstName|lastName|displayName|email|phone|userId|puid|anid|cid)"\s*:\s*")[^"]*(")', re.I),
+     r"\1redacted\2"),
+    (re.compile(r"([?&](?:token|code|t|ppft|uaid|opid|wreply)=)[^&\"'\s]+", re.I), r"\1redacted"),
+]
+
+def _sanitize_input(match):
+    tag = match.group(0)
+    input_type = re.search(r"""\btype\s*=\s*["']?(\w+)""", tag, re.I)
+    if input_type is None or input_type.group(1).lower() in SENSITIVE_INPUT_TYPES:
+        tag = re.sub(r"""(\bvalue\s*=\s*)(["']).*?\2""", r"\1\2\2", tag, flags=re.I | re.S)
+    return tag
+
+def sanitize_page(html):
+    """去掉邮箱、个人资料字段、表单隐藏值和URL中的令牌"""
+    html = re.sub(r"<input\b[^>]*>", _sanitize_input, html, flags=re.I)
+    for pattern, replacement in SANITIZE_PATTERNS:
+        html = pattern.sub(replacement, html)
+    return html
+
+# 每个阶段的快照在回放时要跑的解析/页面状态检查
+REPLAY_CHECKS = {
+    "rewards_dashboard": [
+        ("parse_reward_cards", lambda page: parse_reward_cards(page)),
+        ("parse_sign_in_buttons", lambda page: parse_sign_in_buttons(page)),
+        ("parse_bing_points", lambda page: parse_bing_points(page)),
+    ],
+    "points": [("parse_bing_points", lambda page: parse_bing_points(page))],
+    "points_detail": [("parse_pc_search_progress", lambda page: parse_pc_search_progress(page))],
+    "login_after_email": [("classify_page_text", lambda page: sorted(classify_page_text(page)))],
+    "login_after_password": [("classify_page_text", lambda page: sorted(classify_page_text(page)))],
+}
+
+# 录制时在浏览器内得到的期望结果，名称与REPLAY_CHECKS对应；
+# 直接执行页面查询，不退回page_source解析，否则期望结果又来自被检查的解析函数
+LIVE_QUERIES = {
+    "rewards_dashboard": [
+        ("parse_reward_cards", lambda driver: [card["href"] for card in driver.execute_script(REWARD_CARDS_JS)]),
+        ("parse_sign_in_buttons", lambda driver: [btn["text"] for btn in driver.execute_script(SIGN_IN_BUTTONS_JS)]),
+        ("parse_bing_points", lambda driver: live_bing_points(driver)),
+    ],
+    "points": [("parse_bing_points", lambda driver: live_bing_points(driver))],
+    "points_detail": [("parse_pc_search_progress",
+                       lambda driver: page_query(driver, "points_detail", PC_SEARCH_PROGRESS_QUERY_JS))],
+    "login_after_email": [("classify_page_text", lambda driver: live_page_states(driver, "login_after_email"))],
+    "login_after_password": [("classify_page_text", lambda driver: live_page_states(driver, "login_after_password"))],
+}
+
+# 这些检查在快照中应当有数据，期望结果或解析结果为空/未找到都算失败
+REPLAY_REQUIRED = {
+    "rewards_dashboard": ["parse_bing_points"],
+    "points": ["parse_bing_points"],
+    "points_detail": ["parse_pc_search_progress"],
+}
+
+def live_bing_points(driver):
+    total_points, today_points = page_query(driver, "points", BING_POINTS_QUERY_JS)
+    return [total_points or '未找到总积分', today_points or '未找到今日积分']
+
+def live_page_states(driver, site):
+    return sorted(page_query(driver, site, PAGE_STATE_QUERY_JS, page_state_markers()))
+
+def run_live_queries(driver, phase):
+    """录制时执行LIVE_QUERIES，返回{检查名: 结果}"""
+    results = {}
+    for name, query in LIVE_QUERIES.get(phase, []):
+        try:
+            results[name] = json.loads(json.dumps(query(driver), ensure_ascii=False))
+        except Exception as e:
+            if is_connection_error(e):
+                raise
+            results[name] = {"error": str(e)}
+    return results
+
+def is_missing_result(value):
+    """None、空列表、出错或各项都是None/"未找到…"的结果视为没有数据"""
+    if value is None or value == [] or (isinstance(value, dict) and "error" in value):
+        return True
+    if isinstance(value, list):
+        return all(item is None or (isinstance(item, str) and item.startswith("未找到")) for item in value)
+    return False
+
+def run_replay_checks(phase, page):
+    """返回{检查名: 结果}，结果统一转换为JSON可表示的形式"""
+    results = {}
+    for name, check in REPLAY_CHECKS.get(phase, []):
+        try:
+            results[name] = json.loads(json.dumps(check(page), ensure_ascii=False))
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+class CorpusRecorder:
+    """
+    录制真实运行中各阶段的页面快照（脱敏后压缩保存）及页面加载耗时，
+    同时记录当时浏览器内查询的结果，作为离线回放时解析函数的期望结果。
+    每个账号每个阶段每次运行只录一份，写盘在后台线程完成
+    """
+
+    def __init__(self, root, enabled):
+        self.root = os.path.join(root, f"v{CORPUS_VERSION}")
+        self.enabled = enabled
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def start_run(self):
+        """新一次运行开始时清空已录制记录，自动执行模式下每晚都能重新录制"""
+        with self.lock:
+            self.seen.clear()
+
+    def capture(self, driver, phase, page=None, started=None):
+        if not self.enabled:
+            return
+        account = getattr(_log_context, "account", None)
+        with self.lock:
+            if (account, phase) in self.seen:
+                return
+            self.seen.add((account, phase))
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="corpus")
+        try:
+            if page is None:
+                fetch_started = time.perf_counter()
+                page = driver.page_source
+                # 与page_query_seconds对照，衡量页面查询省下的时间
+                metrics.observe("page_source_seconds", time.perf_counter() - fetch_started,
+                                "获取整页源码耗时（仅录制时）", buckets=QUERY_BUCKETS, site=phase)
+            meta = {
+                "schema": CORPUS_VERSION,
+                "phase": phase,
+                "url": sanitize_page(driver.current_url),
+                "captured_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "phase_seconds": round(time.monotonic() - started, 3) if started else None,
+                "timing": driver.execute_script(NAVIGATION_TIMING_JS),
+                "expected": run_live_queries(driver, phase),
+            }
+        except Exception as e:
+            if is_connection_error(e):
+                raise
+            logger.warning(f"录制页面快照失败: {e}")
+            return
+        self.executor.submit(self._write, phase, page, meta)
+
+    def _write(self, phase, page, meta):
+        try:
+            page = sanitize_page(page)
+            data = page.encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            directory = os.path.join(self.root, phase)
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{digest}")
+            meta["bytes"] = len(data)
+            with open(base + ".html.gz", "wb") as f:
+                f.write(gzip.compress(data))
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            logger.info(f"已录制页面快照: {base}.html.gz")
+        except Exception as e:
+            logger.warning(f"保存页面快照失败: {e}")
+
+    def flush(self, timeout=60):
+        """等待已提交的快照写入完成"""
+        if self.executor is None:
+            return
+        try:
+            self.executor.submit(lambda: None).result(timeout=timeout)
+        except Exception:
+            pass
+
+corpus_recorder = CorpusRecorder(CORPUS_DIR, RECORD_CORPUS)
+atexit.register(corpus_recorder.flush)
+
+def iter_corpus(root=CORPUS_DIR, phase=None):
+    """按(元数据路径, 元数据, 页面)遍历当前版本的快照"""
+    version_dir = os.path.join(root, f"v{CORPUS_VERSION}")
+    if not os.path.isdir(version_dir):
+        return
+    for phase_name in sorted(os.listdir(version_dir)):
+        if phase and phase_name != phase:
+            continue
+        directory = os.path.join(version_dir, phase_name)
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(directory, name)
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with gzip.open(meta_path[:-len(".json")] + ".html.gz", "rb") as f:
+                page = f.read().decode("utf-8")
+            yield meta_path, meta, page
+
+# ========== 运行历史 ==========
+RUN_HISTORY_FILE = os.path.join(LOG_DIR, "run_history.json")
+
+def mask_email(email):
+    """输出到终端时隐藏邮箱中间部分"""
+    name, _, domain = str(email).partition("@")
+    return f"{name[:2]}***@{domain}" if domain else f"{name[:2]}***"
+
+def account_label(email):
+    """指标中的账号标签：邮箱的短哈希，不泄露邮箱且不同账号不会像mask_email那样撞在一起"""
+    return hashlib.sha256(str(email).strip().lower().encode("utf-8")).hexdigest()[:8]
+
+class RunHistory:
+    """
+    记录每次运行及其中每个账号的结果。每完成一个账号就写一次文件，
+    既是status命令的数据来源，也是运行中断后的检查点
+    """
+
+    def __init__(self, path=RUN_HISTORY_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.current = None
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        runs = [run for run in self.load() if run.get("id") != self.current["id"]]
+        runs.append(self.current)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(runs[-RUN_HISTORY_KEEP:], f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start_run(self, mode):
+        now = datetime.datetime.now()
+        with self.lock:
+            self.current = {
+                "id": now.strftime("%Y%m%d_%H%M%S"),
+                "mode": mode,
+                "started_at": now.isoformat(timespec="seconds"),
+                "finished_at": None,
+                "status": "running",
+                "accounts": [],
+            }
+            self._save()
+
+    def record_account(self, group_name, email, status, points=(None, None), error=None):
+        total_points, today_points = points or (None, None)
+        with self.lock:
+            self.current["accounts"].append({
+                "group": group_name,
+                "email": email,
+                "status": status,
+                "total_points": total_points,
+                "today_points": today_points,
+                "error": error,
+                "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            })
+            self._save()
+
+    def finish_run(self, status):
+        with self.lock:
+            self.current["finished_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+            self.current["status"] = status
+            self._save()
+
+def points_value(points):
+    """积分字段转为整数，'未找到总积分'等返回None"""
+    digits = re.sub(r"[^\d]", "", str(points or ""))
+    return int(digits) if digits else None
+
+def publish_run_metrics(history, duration):
+    """把本次运行结果和各账号积分变化写入指标，并更新textfile"""
+    run = history.current
+    metrics.set("last_run_timestamp_seconds", int(time.time()), "最近一次运行结束时间")
+    metrics.set("last_run_duration_seconds", round(duration, 1), "最近一次运行总耗时")
+    metrics.set("last_run_success", 1 if run["status"] == "ok" else 0, "最近一次运行是否全部账号成功")
+    metrics.inc("runs_total", "按结果统计的运行次数", status=run["status"])
+    metrics.clear("last_run_accounts")
+    for status in ("ok", "failed", "skipped", "cancelled", "killed"):
+        count = sum(1 for account in run["accounts"] if account["status"] == status)
+        metrics.set("last_run_accounts", count, "最近一次运行各结果的账号数", status=status)
+
+    # 与之前运行中最近一次读到的总积分比较
+    previous = {}
+    for past in history.load():
+        if past.get("id") == run["id"]:
+            continue
+        for account in past.get("accounts", []):
+            value = points_value(account.get("total_points"))
+            if value is not None:
+                previous[account["email"]] = value
+    for name in ("account_points", "account_points_today", "account_points_delta"):
+        metrics.clear(name)
+    for account in run["accounts"]:
+        label = account_label(account["email"])
+        total = points_value(account.get("total_points"))
+        today = points_value(account.get("today_points"))
+        if total is not None:
+            metrics.set("account_points", total, "账号总积分", account=label)
+            if account["email"] in previous:
+                metrics.set("account_points_delta", total - previous[account["email"]],
+                            "与上次读到的总积分相比的变化", account=label)
+        if today is not None:
+            metrics.set("account_points_today", today, "账号今日积分", account=label)
+    metrics.write_textfile()
+
+def main(mode="once", isolate=GROUP_ISOLATION):
+    run_log = start_run_log()
+    history = RunHistory()
+    history.start_run(mode)
+    corpus_recorder.start_run()
+    started = time.monotonic()
+    asset_before = asset_cache_totals()
+    status = "failed"
+    try:
+        run_all_groups(history, isolate)
+        accounts = history.current["accounts"]
+        failed = [a for a in accounts if a["status"] != "ok"]
+        if accounts and len(failed) == len(accounts):
+            status = "failed"
+        else:
+            status = "partial" if failed else "ok"
+    finally:
+        if shutdown_event.is_set():
+            status = "cancelled"
+        history.finish_run(status)
+        publish_run_metrics(history, time.monotonic() - started)
+        logger.info(asset_cache_summary(asset_before))
+        artifact_store.flush()
+        corpus_recorder.flush()
+        timeout_manager.save()
+        logger.info(f"各等待点当前等待时间: {timeout_manager.summary()}")
+        logger.info(f"本次运行日志: {run_log}.gz")
+        finish_run_log()
+        flush_logs()
+
+def run_all_groups(history=None, isolate=False):
     logger.info("=== 程序开始执行 ===")
     logger.info("正在加载账号配置...")
     account_groups = load_account_groups()
@@ -1167,15 +3834,23 @@ def main():
     search_words = get_bing_hotwords()
     logger.info(f"成功获取到 {len(search_words)} 个搜索关键词")
     
-    # 使用多线程并行处理每个账号组
-    import threading
-    
+    # 使用多线程并行处理每个账号组，隔离模式下每个线程负责监管一个子进程
+    log_forwarder = ProcessLogForwarder() if isolate else None
+    if isolate:
+        logger.info("已启用进程隔离模式，每个账号组在独立子进程中运行")
     threads = []
     for i, (group_name, accounts) in enumerate(account_groups.items()):
         logger.info(f"创建账号组 {group_name} 的处理线程...")
+        if isolate:
+            target = run_group_in_process
+            args = (group_name, accounts, search_words, history, log_forwarder.queue)
+        else:
+            target = process_account_group
+            args = (group_name, accounts, search_words, history)
         thread = threading.Thread(
-            target=process_account_group, 
-            args=(group_name, accounts, search_words)
+            target=target, 
+            args=args,
+            name=f"group-{group_name}"
         )
         threads.append(thread)
         thread.start()
@@ -1183,29 +3858,31 @@ def main():
         
         # 增加延迟时间，避免同时启动时的资源竞争
         if i < len(account_groups) - 1:  # 不是最后一个group
-            logger.info("等待15秒后启动下一个账号组，避免资源竞争...")
-            time.sleep(15)
+            logger.info(f"等待{GROUP_START_DELAY}秒后启动下一个账号组，避免资源竞争...")
+            if shutdown_event.wait(GROUP_START_DELAY):
+                break
     
     # 等待所有线程完成
     logger.info("等待所有账号组任务完成...")
-    for thread in threads:
-        thread.join()
+    join_threads_with_grace(threads)
+    if history:
+        for group_name, accounts in list(account_groups.items())[len(threads):]:
+            for account in accounts:
+                history.record_account(group_name, account['email'], "cancelled", error="收到关闭信号，账号组未启动")
+    if log_forwarder:
+        log_forwarder.stop()
     
     logger.info("=== 所有账号组任务完成 ===")                 
 
-def wait_until_2am():
+def wait_until_2am(isolate=GROUP_ISOLATION):
     """等待到凌晨2点自动执行"""
     logger.info("=== 启动自动执行模式 ===")
     logger.info("程序将在每天凌晨2点自动执行")
     
-    while True:
+    while not shutdown_event.is_set():
         try:
             now = datetime.datetime.now()
-            next_run = now.replace(hour=2, minute=0, second=0, microsecond=0)
-            
-            # 如果当前时间已经过了今天的2点，则设置为明天的2点
-            if now >= next_run:
-                next_run += datetime.timedelta(days=1)
+            next_run = next_auto_run(now)
             
             wait_seconds = (next_run - now).total_seconds()
             hours = wait_seconds // 3600
@@ -1213,42 +3890,380 @@ def wait_until_2am():
             
             logger.info(f"距离下次执行还有 {hours:.0f}小时{minutes:.0f}分钟")
             logger.info(f"下次执行时间: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+            metrics.set("next_run_timestamp_seconds", int(next_run.timestamp()), "下次计划运行时间")
+            metrics.write_textfile()
             
-            # 每小时输出一次状态
+            # 每小时输出一次状态，未到执行时间时继续等待
             if hours >= 1:
-                time.sleep(3600)  # 睡1小时
-            else:
-                time.sleep(wait_seconds)  # 睡到执行时间
+                interruptible_sleep(3600)  # 睡1小时
+                continue
+            interruptible_sleep(wait_seconds)  # 睡到执行时间
             
             logger.info("=== 开始执行定时任务 ===")
-            main()
+            main(mode="auto", isolate=isolate)
             logger.info("=== 定时任务执行完成 ===")
             
-        except KeyboardInterrupt:
-            logger.info("收到中断信号，退出自动执行模式")
+        except (KeyboardInterrupt, ShutdownRequested):
             break
         except Exception as e:
             logger.error(f"自动执行过程中发生错误: {e}")
             logger.info("等待1小时后重试...")
-            time.sleep(3600)
+            if shutdown_event.wait(3600):
+                break
+    logger.info("收到中断信号，退出自动执行模式")
 
-if __name__ == "__main__":
-    import sys
-    
-    # 检查命令行参数
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--once":
-            # 只执行一次
-            logger.info("=== 单次执行模式 ===")
-            main()
-        elif sys.argv[1] == "--auto":
-            # 自动执行模式
-            wait_until_2am()
+# ========== 命令行 ==========
+ACCOUNT_FIXED_SECONDS = 60  # plan估算：登录、签到等每个账号的固定耗时
+
+def load_heavy_modules():
+    """主动导入浏览器相关依赖（bench用于对比）"""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+def next_auto_run(now=None):
+    now = now or datetime.datetime.now()
+    next_run = now.replace(hour=AUTO_RUN_HOUR, minute=0, second=0, microsecond=0)
+    if now >= next_run:
+        next_run += datetime.timedelta(days=1)
+    return next_run
+
+def apply_run_options(args):
+    """处理run/auto共有的可选功能，同时写入环境变量传给隔离模式下的子进程"""
+    if getattr(args, "record", False):
+        os.environ["RECORD_CORPUS"] = "1"
+        corpus_recorder.enabled = True
+        logger.info(f"已启用页面快照录制，保存到 {corpus_recorder.root}")
+    if getattr(args, "asset_cache", False):
+        os.environ["ASSET_CACHE"] = "1"
+        asset_cache.enabled = True
+    if asset_cache.enabled:
+        logger.info(f"已启用静态资源共享缓存: {asset_cache.root}")
+    if getattr(args, "backend", None):
+        os.environ["BROWSER_BACKEND"] = args.backend
+    logger.info(f"浏览器后端: {get_browser_backend().name}")
+
+def profile_dir():
+    return os.path.join(LOG_DIR, f"profile_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+def write_profile_report():
+    path = profiler.write_report(profile_dir())
+    if path:
+        logger.info(f"性能剖析报告: {path}")
+        print(f"性能剖析报告: {path}")
+
+def cmd_run(args):
+    logger.info("=== 单次执行模式 ===")
+    apply_run_options(args)
+    isolate = getattr(args, "isolate", False) or GROUP_ISOLATION
+    if getattr(args, "profile", False):
+        if isolate:
+            # 剖析数据只在本进程内收集
+            logger.warning("性能剖析时不使用进程隔离模式")
+            isolate = False
+        profiler.start()
+    try:
+        main(isolate=isolate)
+    finally:
+        write_profile_report()
+
+def cmd_auto(args):
+    apply_run_options(args)
+    start_metrics_server()
+    wait_until_2am(isolate=args.isolate or GROUP_ISOLATION)
+
+def cmd_status(args):
+    """从运行历史输出最近几次运行的结果，不加载任何浏览器依赖"""
+    runs = RunHistory().load()[-args.last:]
+    if args.json:
+        print(json.dumps(runs, ensure_ascii=False, indent=2))
+        return
+    if not runs:
+        print("暂无运行记录")
+    for run in runs:
+        print(f"运行 {run['id']} ({run.get('mode')}): {run['status']}，开始 {run['started_at']}，结束 {run.get('finished_at') or '-'}")
+        for account in run.get("accounts", []):
+            line = f"  [{account['group']}] {mask_email(account['email'])}: {account['status']}"
+            if account.get("total_points") is not None:
+                line += f"，总积分 {account['total_points']}，今日积分 {account['today_points']}"
+            if account.get("error"):
+                line += f"，错误: {account['error']}"
+            print(line)
+    print(f"自动模式下次执行时间: {next_auto_run().strftime('%Y-%m-%d %H:%M:%S')}")
+
+def estimate_account_seconds(word_count):
+    """按当前配置估算单个账号的耗时"""
+    mean_sleep = sum(SLEEP_BETWEEN_SEARCH) / 2
+    # 每次搜索后get_bing_points等待8秒，每4次查询一次搜索进度再等8秒
+    search = word_count * (mean_sleep + 8) + (word_count // 4) * 8
+    pauses = (word_count // 5) * SLEEP_AFTER_4_SEARCH
+    return ACCOUNT_FIXED_SECONDS + search + pauses
+
+def cmd_plan(args):
+    """输出一次运行将处理的账号组和预计耗时，不启动浏览器"""
+    account_groups = load_account_groups()
+    words = get_bing_hotwords() if args.fetch_words else DEFAULT_SEARCH_WORDS
+    per_account = estimate_account_seconds(len(words))
+    print(f"账号组 {len(account_groups)} 个，搜索关键词 {len(words)} 个，单账号预计 {per_account / 60:.0f} 分钟")
+    finish = 0
+    for i, (group_name, accounts) in enumerate(account_groups.items()):
+        group_seconds = per_account * len(accounts)
+        finish = max(finish, i * GROUP_START_DELAY + group_seconds)
+        emails = ", ".join(mask_email(a["email"]) for a in accounts)
+        print(f"  [{group_name}] {len(accounts)} 个账号，预计 {group_seconds / 60:.0f} 分钟: {emails}")
+    print(f"并行执行预计总耗时 {finish / 60:.0f} 分钟")
+
+BENCH_IMPORT_SNIPPET = """
+import importlib, json, sys, time
+sys.path.insert(0, {directory!r})
+t0 = time.perf_counter()
+module = importlib.import_module({module!r})
+t1 = time.perf_counter()
+light_rss = module.current_rss_mb()
+module.load_heavy_modules()
+t2 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "light_rss_mb": light_rss,
+                  "heavy_ms": (t2 - t1) * 1000, "heavy_rss_mb": module.current_rss_mb()}}))
+"""
+
+# 浏览器后端基准测试使用的本地替身页面，不依赖外部网络
+STAND_IN_PAGE = """<!doctype html><html><head><title>stand-in</title><link rel="stylesheet" href="/app.css">
+<script src="/app.js"></script></head><body>
+<div class="c-card-content">{cards}</div>
+<input name="q" type="text"><button id="target">签到</button>
+</body></html>"""
+STAND_IN_ASSETS = {
+    "/app.css": ("text/css", ".c-card-content a{display:block}\n" * 2000),
+    "/app.js": ("application/javascript", "var filler = [];\n" + "filler.push('x');\n" * 5000),
+}
+
+def start_stand_in_server():
+    """在127.0.0.1随机端口提供替身页面和静态资源，返回(server, 页面URL)"""
+    import http.server
+    cards = "".join(f'<a href="/task{i}"><span class="mee-icon-AddMedium">+</span>任务{i}</a>' for i in range(2000))
+    pages = {"/": ("text/html; charset=utf-8", STAND_IN_PAGE.format(cards=cards)), **STAND_IN_ASSETS}
+
+    class StandInHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            content_type, body = pages.get(self.path.split("?")[0], ("text/plain", ""))
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "max-age=3600")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stand-in-http", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def driver_tree_memory_mb(driver):
+    """浏览器及chromedriver（如有）进程树的内存，按PSS求和"""
+    roots = [getattr(driver, "browser_pid", None),
+             getattr(getattr(getattr(driver, "service", None), "process", None), "pid", None)]
+    pids = set()
+    for root in filter(None, roots):
+        pids.update(process_tree_pids(root))
+    return sum(process_pss_mb(pid) for pid in pids)
+
+def _bench_browser_entry(conn, backend_name, url, repeat):
+    """子进程入口：用指定后端启动浏览器并对替身页面测量各项耗时"""
+    import statistics
+    def median_ms(action):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            action()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    driver = None
+    try:
+        load_heavy_modules()
+        python_rss = current_rss_mb()
+        started = time.perf_counter()
+        driver = launch_chrome("bench", get_chrome_version_main(), f"chrome_bench_{backend_name}_",
+                               backend=get_browser_backend(backend_name))
+        result = {"startup_s": time.perf_counter() - started}
+        driver.get(url)
+        result["navigate_ms"] = median_ms(lambda: driver.get(url))
+        result["script_ms"] = median_ms(lambda: driver.execute_script("return 1"))
+        result["find_ms"] = median_ms(lambda: driver.find_element(By.CSS_SELECTOR, "#target"))
+        result["cards_ms"] = median_ms(lambda: find_reward_cards(driver))
+        result["page_source_ms"] = median_ms(lambda: driver.page_source)
+        # 反复加载大页面后V8迟迟不回收，先触发一次垃圾回收，比较的是稳定占用
+        driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+        time.sleep(1)
+        result["browser_mem_mb"] = driver_tree_memory_mb(driver)
+        result["python_rss_mb"] = current_rss_mb() - python_rss
+        conn.send(result)
+    except Exception as e:
+        conn.send({"error": str(e).splitlines()[0] if str(e) else type(e).__name__})
+    finally:
+        quit_driver(driver)
+        conn.close()
+
+def bench_browsers(backends, repeat):
+    """每个后端在独立子进程中测量，互不影响内存数据"""
+    server, url = start_stand_in_server()
+    ctx = multiprocessing.get_context("spawn")
+    columns = [("startup_s", "启动(s)", "{:.2f}"), ("navigate_ms", "打开页面(ms)", "{:.1f}"),
+               ("script_ms", "脚本(ms)", "{:.2f}"), ("find_ms", "查找元素(ms)", "{:.2f}"),
+               ("cards_ms", "批量查询(ms)", "{:.1f}"), ("page_source_ms", "整页源码(ms)", "{:.1f}"),
+               ("browser_mem_mb", "浏览器PSS(MB)", "{:.0f}"), ("python_rss_mb", "Python增量(MB)", "{:.1f}")]
+    print(f"替身页面: {url}，每项重复 {repeat} 次取中位数")
+    print("后端".ljust(10) + "".join(title.rjust(16) for _, title, _ in columns))
+    try:
+        for name in backends:
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_bench_browser_entry, args=(child_conn, name, url, repeat), name=f"bench-{name}")
+            proc.start()
+            child_conn.close()
+            result = parent_conn.recv() if parent_conn.poll(300) else {"error": "超时"}
+            proc.join(timeout=30)
+            if proc.is_alive():
+                kill_process_tree(proc.pid)
+            if "error" in result:
+                print(f"{name.ljust(10)}不可用: {result['error']}")
+                continue
+            print(name.ljust(10) + "".join(fmt.format(result[key]).rjust(16) for key, _, fmt in columns))
+    finally:
+        server.shutdown()
+
+def cmd_bench(args):
+    """在子进程中测量脚本导入耗时与常驻内存，对比加载浏览器依赖前后；--browsers时改为对比浏览器后端"""
+    if args.browsers:
+        bench_browsers([name.strip() for name in args.browsers.split(",") if name.strip()], args.repeat)
+        return
+    import statistics
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(__file__))
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    snippet = BENCH_IMPORT_SNIPPET.format(directory=directory, module=module)
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.repeat):
+            output = subprocess.check_output([sys.executable, "-c", snippet], cwd=workdir, stderr=subprocess.DEVNULL)
+            samples.append(json.loads(output.decode().strip().splitlines()[-1]))
+    median = lambda key: statistics.median(sample[key] for sample in samples)
+    print(f"导入耗时(不含浏览器依赖): {median('import_ms'):.0f} ms，常驻内存 {median('light_rss_mb'):.1f} MB")
+    print(f"加载浏览器依赖额外耗时: {median('heavy_ms'):.0f} ms，常驻内存 {median('heavy_rss_mb'):.1f} MB")
+
+def cmd_replay(args):
+    """对快照库跑所有解析函数，与录制时浏览器内的查询结果比对，并报告每个阶段的吞吐"""
+    stats = {}
+    mismatches = []
+    if args.profile:
+        profiler.start()
+    for meta_path, meta, page in iter_corpus(phase=args.phase):
+        phase = meta["phase"]
+        entry = stats.setdefault(phase, {"snapshots": 0, "ok": 0, "mismatch": 0, "missing": 0,
+                                         "bytes": 0, "seconds": 0.0})
+        started = time.perf_counter()
+        with profiler.phase(f"replay_{phase}"):
+            for _ in range(args.repeat):
+                results = run_replay_checks(phase, page)
+        entry["seconds"] += time.perf_counter() - started
+        entry["snapshots"] += 1
+        entry["bytes"] += len(page.encode("utf-8")) * args.repeat
+        if args.update:
+            meta["expected"] = results
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+        expected = meta.get("expected") or {}
+        # 应当有数据的检查无论哪一边为空都不能算通过，否则两边都解析失败也会"一致"
+        missing = [name for name in REPLAY_REQUIRED.get(phase, [])
+                   if is_missing_result(expected.get(name)) or is_missing_result(results.get(name))]
+        if missing:
+            entry["missing"] += 1
+            mismatches.append((meta_path, f"缺少数据: {', '.join(missing)}", expected, results))
+        elif results == expected:
+            entry["ok"] += 1
         else:
-            print("使用方法:")
-            print("python bingZDH.py          # 执行一次")
-            print("python bingZDH.py --once   # 执行一次")
-            print("python bingZDH.py --auto   # 每天凌晨2点自动执行")
+            entry["mismatch"] += 1
+            mismatches.append((meta_path, "不一致", expected, results))
+    if not stats:
+        print(f"快照库为空（{os.path.join(CORPUS_DIR, f'v{CORPUS_VERSION}')}），请先使用 run --record 录制")
+        return
+    for phase, entry in sorted(stats.items()):
+        runs = entry["snapshots"] * args.repeat
+        per_page_ms = entry["seconds"] / runs * 1000
+        throughput = entry["bytes"] / 1024 / 1024 / entry["seconds"] if entry["seconds"] else 0
+        print(f"{phase}: 快照 {entry['snapshots']} 个，一致 {entry['ok']}，不一致 {entry['mismatch']}，"
+              f"缺少数据 {entry['missing']}，平均 {per_page_ms:.1f} ms/页，{throughput:.1f} MB/s")
+    write_profile_report()
+    for meta_path, reason, expected, results in mismatches:
+        print(f"{reason}: {meta_path}\n  录制时浏览器: {expected}\n  当前解析:     {results}")
+    if mismatches and not args.update:
+        sys.exit(1)
+
+def positive_int(value):
+    """argparse类型：至少为1的整数"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须大于0: {value}")
+    return number
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="bingZDH.py", description="Bing Rewards 自动签到脚本，默认执行一次")
+    subparsers = parser.add_subparsers(dest="command")
+    run = subparsers.add_parser("run", help="立即执行一次")
+    auto = subparsers.add_parser("auto", help=f"每天{AUTO_RUN_HOUR}点自动执行")
+    for sub in (run, auto):
+        sub.add_argument("--isolate", action="store_true", help="每个账号组在独立子进程中运行")
+        sub.add_argument("--record", action="store_true", help="录制脱敏的页面快照，供replay离线回放")
+        sub.add_argument("--asset-cache", action="store_true", help="跨运行共享JS/CSS等静态资源的磁盘缓存")
+        sub.add_argument("--backend", choices=sorted(BROWSER_BACKENDS), help="浏览器后端，默认selenium")
+    run.add_argument("--profile", action="store_true", help="按阶段收集CPU和内存分配剖析数据，结束时写出报告")
+    status = subparsers.add_parser("status", help="查看最近的运行结果")
+    status.add_argument("--last", type=int, default=1, help="显示最近几次运行")
+    status.add_argument("--json", action="store_true", help="以JSON输出")
+    plan = subparsers.add_parser("plan", help="查看将处理的账号组和预计耗时")
+    plan.add_argument("--fetch-words", action="store_true", help="实际获取热搜词而不是使用默认关键词")
+    bench = subparsers.add_parser("bench", help="测量导入耗时和内存占用")
+    bench.add_argument("--repeat", type=positive_int, default=3, help="测量次数，取中位数")
+    bench.add_argument("--browsers", nargs="?", const=",".join(BROWSER_BACKENDS), metavar="后端列表",
+                       help="改为对比浏览器后端（默认全部，如selenium,cdp）的启动时间、命令延迟和内存")
+    replay = subparsers.add_parser("replay", help="用录制的页面快照离线检查解析函数的正确性和速度")
+    replay.add_argument("--phase", help="只回放指定阶段")
+    replay.add_argument("--repeat", type=positive_int, default=1, help="每个快照重复解析次数，用于测量吞吐")
+    replay.add_argument("--update", action="store_true", help="把当前解析结果写回为期望结果")
+    replay.add_argument("--profile", action="store_true", help="对解析过程做CPU和内存分配剖析")
+    return parser
+
+COMMANDS = {
+    "run": cmd_run,
+    "auto": cmd_auto,
+    "status": cmd_status,
+    "plan": cmd_plan,
+    "bench": cmd_bench,
+    "replay": cmd_replay,
+}
+
+# 兼容旧的参数写法
+LEGACY_FLAGS = {"--once": "run", "--auto": "auto"}
+
+def cli(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in LEGACY_FLAGS:
+        argv[0] = LEGACY_FLAGS[argv[0]]
+    args = build_parser().parse_args(argv)
+    command = args.command or "run"
+    if command in ("run", "auto"):
+        setup_logging()
+        install_shutdown_handlers()
     else:
-        # 默认执行一次
-        main()
+        setup_console_logging()
+    try:
+        COMMANDS[command](args)
+    finally:
+        if command in ("run", "auto"):
+            quit_all_drivers()
+    return shutdown_exit_code()
+
+if __name__ == "__main__":
+    sys.exit(cli())